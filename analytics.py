@@ -0,0 +1,154 @@
+import threading
+from collections import Counter
+
+import pandas as pd
+
+
+# --- CLASS ANALYTICS ---
+# Materialized aggregates over the quiz results store. Every statistic the
+# dashboard shows is a ratio of additive totals (score sums and counts per
+# subject, chapter, student and student/subject), so each flushed batch is
+# reduced on its own and added into running totals, at a cost that depends
+# on the batch rather than on everything recorded so far. The pass/fail
+# bands are moved per student as their average changes. A snapshot for the
+# dashboard only divides totals and copies dictionaries; the results store
+# is scanned once per process, not on every flush.
+
+PASS_MARK = 50        # percent
+BORDERLINE_MARK = 40  # percent; [BORDERLINE_MARK, PASS_MARK) counts as borderline
+BANDS = ["Pass", "Fail", "Borderline"]
+
+_COLUMNS = ["attempt_id", "student", "subject", "chapter", "correct"]
+
+
+def _band(pct):
+    if pct >= PASS_MARK:
+        return "Pass"
+    return "Borderline" if pct >= BORDERLINE_MARK else "Fail"
+
+
+class ClassTotals:
+    """Running sums behind ClassAnalytics: ``(score sum, count)`` per key."""
+
+    def __init__(self):
+        self.rows = 0
+        self.subjects = {}          # subject -> (attempt pct sum, attempts)
+        self.chapters = {}          # (subject, chapter) -> (correct answers, answers)
+        self.students = {}          # student -> (attempt pct sum, attempts)
+        self.student_subject = {}   # student -> {subject: (attempt pct sum, attempts)}; inner dicts are replaced, not mutated
+        self.bands = Counter()      # band -> students currently in it
+
+    def add(self, attempts):
+        """Fold in ``attempts``, a DataFrame with one row per answered question.
+
+        All rows of one attempt must arrive in the same call; the results
+        store writes whole attempts in each flush.
+        """
+        if attempts.empty:
+            return
+        df = attempts[_COLUMNS]
+        self.rows += len(df)
+        per_attempt = (
+            df.groupby(["attempt_id", "student", "subject"], sort=False)["correct"].mean().mul(100).rename("pct").reset_index()
+        )
+        by_chapter = df.groupby(["subject", "chapter"], sort=False)["correct"].agg(["sum", "count"])
+        by_pair = per_attempt.groupby(["student", "subject"], sort=False)["pct"].agg(["sum", "count"])
+
+        for key, (correct, n) in zip(by_chapter.index, by_chapter.to_numpy()):
+            c, m = self.chapters.get(key, (0.0, 0))
+            self.chapters[key] = (c + correct, m + int(n))
+
+        changed = {}
+        for (student, subject), (pct, n) in zip(by_pair.index, by_pair.to_numpy()):
+            n = int(n)
+            s, m = self.subjects.get(subject, (0.0, 0))
+            self.subjects[subject] = (s + pct, m + n)
+            inner = changed.get(student)
+            if inner is None:
+                inner = changed[student] = dict(self.student_subject.get(student, ()))
+            s, m = inner.get(subject, (0.0, 0))
+            inner[subject] = (s + pct, m + n)
+
+        for student, inner in changed.items():
+            self.student_subject[student] = inner
+            old = self.students.get(student)
+            new = (sum(s for s, _ in inner.values()), sum(n for _, n in inner.values()))
+            if old:
+                self.bands[_band(old[0] / old[1])] -= 1
+            self.bands[_band(new[0] / new[1])] += 1
+            self.students[student] = new
+
+
+class ClassAnalytics:
+    def __init__(self, totals=None):
+        """A snapshot of ``totals``; later folds into them don't change it."""
+        totals = totals if totals is not None else ClassTotals()
+        self.rows = totals.rows
+        self.subject_average = pd.Series(
+            {subject: s / n for subject, (s, n) in totals.subjects.items()}, dtype="float64",
+        ).sort_values(ascending=False)
+        self.chapter_understanding = pd.DataFrame(
+            [(subject, chapter, c / n * 100) for (subject, chapter), (c, n) in totals.chapters.items()],
+            columns=["subject", "chapter", "understanding"],
+        )
+        self.pass_distribution = pd.Series([totals.bands[b] for b in BANDS], index=BANDS, dtype="int64")
+        # Shallow copies: ClassTotals replaces entries instead of mutating them
+        self._students = dict(totals.students)
+        self._student_subject = dict(totals.student_subject)
+
+    @classmethod
+    def empty(cls):
+        return cls()
+
+    def chapters_for(self, subject=None):
+        cu = self.chapter_understanding
+        if subject is not None:
+            cu = cu[cu["subject"] == subject]
+        return cu.sort_values("understanding")
+
+    def weakest_chapters(self, subject=None, n=2):
+        return self.chapters_for(subject).head(n)
+
+    def student_profile(self, username):
+        """Attempts completed plus the subject furthest below and above the class average."""
+        attempts = self._students.get(username, (0.0, 0))[1]
+        subjects = self._student_subject.get(username)
+        if not subjects:
+            return {"attempts": attempts, "weakness": None, "strength": None}
+        rows = [(subject, s / n, s / n - self.subject_average[subject]) for subject, (s, n) in subjects.items()]
+        weakest = min(rows, key=lambda r: r[2])
+        strongest = max(rows, key=lambda r: r[2])
+        return {
+            "attempts": attempts,
+            "weakness": (weakest[0], float(weakest[1]), float(weakest[2])),
+            "strength": (strongest[0], float(strongest[1]), float(strongest[2])),
+        }
+
+
+def build_analytics(results_store):
+    """One-off analytics from a full scan of the store."""
+    totals = ClassTotals()
+    totals.add(results_store.scan(columns=_COLUMNS).to_pandas())
+    return ClassAnalytics(totals)
+
+
+class LiveAnalytics:
+    """ClassAnalytics kept current by folding in each batch the results store flushes."""
+
+    def __init__(self, results_store):
+        self._lock = threading.Lock()
+        self._totals = ClassTotals()
+        self._current = None
+        results_store.follow(self._add, columns=_COLUMNS)
+
+    def _add(self, table):
+        attempts = table.to_pandas()
+        with self._lock:
+            self._totals.add(attempts)
+            self._current = None
+
+    def current(self):
+        with self._lock:
+            if self._current is None:
+                self._current = ClassAnalytics(self._totals)
+            return self._current
@@ -0,0 +1,205 @@
+import hashlib
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+# --- ANSWER CACHE ---
+# Persistent cache for free-text AI answers (Ask PDF, remedial plans,
+# lesson plans). Entries are keyed by the document they were answered
+# against plus the normalized question, so the same question about the same
+# syllabus costs one Gemini call per TTL no matter how many students ask it.
+# Near-identical wordings are matched with MinHash over word shingles,
+# looked up through LSH bands so a miss never scans the table, and must use
+# the same content words: only stopwords, filler such as "please" and word
+# order may differ, so swapping one term for another is a miss. Entries
+# expire after ``ttl`` seconds, the least recently used are evicted beyond
+# ``max_entries``, and single entries or whole documents can be invalidated.
+
+CACHE_FILE = "answer_cache.db"
+
+NUM_PERM = 64
+BANDS = 16                  # NUM_PERM / BANDS rows per band
+_ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20260)   # fixed seed: signatures must stay comparable across restarts
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+# Words a rewording may add, drop or move without changing the question
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "its",
+    "of", "on", "or", "that", "the", "this", "to", "was", "were", "with",
+    "do", "does", "can", "could", "would", "i", "me", "my", "we", "you", "your", "us",
+    "please", "kindly", "tell", "give", "briefly",
+}
+
+CachedAnswer = namedtuple("CachedAnswer", ["id", "question", "answer", "near"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    doc_key TEXT NOT NULL,
+    q_hash TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (doc_key, q_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_answers_last_hit ON answers (last_hit);
+CREATE INDEX IF NOT EXISTS idx_answers_created ON answers (created_at);
+CREATE TABLE IF NOT EXISTS answer_bands (
+    band TEXT NOT NULL,
+    answer_id INTEGER NOT NULL REFERENCES answers (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_answer_bands ON answer_bands (band);
+CREATE INDEX IF NOT EXISTS idx_answer_bands_answer ON answer_bands (answer_id);
+"""
+
+
+def normalize_question(text):
+    return " ".join(re.findall(r"[a-z0-9]+", text.casefold().replace("'", "")))
+
+
+def _shingles(normalized):
+    words = normalized.split()
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def _content_words(normalized):
+    return set(normalized.split()) - _STOPWORDS
+
+
+def minhash(normalized):
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+              for s in _shingles(normalized)] or [0]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS]
+
+
+def _bands(doc_key, signature):
+    # Bands are scoped to the document so a near match never crosses syllabi
+    return [
+        hashlib.blake2b(f"{doc_key}|{i}|{signature[i * _ROWS:(i + 1) * _ROWS]}".encode("utf-8"), digest_size=12).hexdigest()
+        for i in range(BANDS)
+    ]
+
+
+def _similarity(sig_a, sig_b):
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / NUM_PERM
+
+
+class AnswerCache:
+    def __init__(self, path=CACHE_FILE, ttl=7 * 24 * 3600, max_entries=5000, near_threshold=0.8):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.near_threshold = near_threshold
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, kind):
+        with self._stats_lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    @staticmethod
+    def _key(normalized):
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get(self, doc_key, question, near=True):
+        """Cached :class:`CachedAnswer` for ``question`` about ``doc_key``, or None.
+
+        Tries the exact normalized question first, then (with ``near``) the
+        closest cached wording whose estimated shingle similarity reaches
+        ``near_threshold`` and which has the same content words.
+        """
+        normalized = normalize_question(question)
+        fresh_after = time.time() - self.ttl
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, question, answer FROM answers WHERE doc_key = ? AND q_hash = ? AND created_at > ?",
+                (doc_key, self._key(normalized), fresh_after),
+            ).fetchone()
+            kind = "hits"
+            if row is None and near:
+                signature = minhash(normalized)
+                bands = _bands(doc_key, signature)
+                candidates = conn.execute(
+                    f"SELECT DISTINCT a.id, a.question, a.answer, a.signature FROM answer_bands b JOIN answers a ON a.id = b.answer_id "
+                    f"WHERE b.band IN ({','.join('?' * len(bands))}) AND a.created_at > ?",
+                    (*bands, fresh_after),
+                ).fetchall()
+                words = _content_words(normalized)
+                scored = [(_similarity(signature, struct.unpack(f"{NUM_PERM}Q", sig)), id_, cached_q, answer)
+                          for id_, cached_q, answer, sig in candidates
+                          if _content_words(normalize_question(cached_q)) == words]
+                best = max(scored, default=None)
+                if best and best[0] >= self.near_threshold:
+                    row, kind = best[1:], "near_hits"
+            if row is None:
+                self._count("misses")
+                return None
+            conn.execute("UPDATE answers SET hits = hits + 1, last_hit = ? WHERE id = ?", (time.time(), row[0]))
+        self._count(kind)
+        return CachedAnswer(*row, near=kind == "near_hits")
+
+    def put(self, doc_key, question, answer):
+        normalized = normalize_question(question)
+        signature = minhash(normalized)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM answers WHERE doc_key = ? AND q_hash = ?", (doc_key, self._key(normalized)))
+            cur = conn.execute(
+                "INSERT INTO answers (doc_key, q_hash, question, answer, signature, created_at, last_hit) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (doc_key, self._key(normalized), question, answer, struct.pack(f"{NUM_PERM}Q", *signature), now, now),
+            )
+            conn.executemany("INSERT INTO answer_bands (band, answer_id) VALUES (?, ?)",
+                             [(band, cur.lastrowid) for band in _bands(doc_key, signature)])
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl,))
+        excess = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute("DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_hit LIMIT ?)", (excess,))
+
+    def invalidate(self, doc_key, question=None):
+        """Drop the entry for ``question`` about ``doc_key``, or every entry for the document. Returns the count."""
+        with self._connect() as conn:
+            if question is None:
+                return conn.execute("DELETE FROM answers WHERE doc_key = ?", (doc_key,)).rowcount
+            return conn.execute("DELETE FROM answers WHERE doc_key = ? AND q_hash = ?",
+                                (doc_key, self._key(normalize_question(question)))).rowcount
+
+    def remove(self, entry_id):
+        """Drop one entry by the id of a :class:`CachedAnswer` (e.g. one served as a near match)."""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM answers WHERE id = ?", (entry_id,)).rowcount
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = self.hits + self.near_hits + self.misses
+        return {"entries": entries, "hits": self.hits, "near_hits": self.near_hits, "misses": self.misses,
+                "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0}
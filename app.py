@@ -1,13 +1,25 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime
+import importlib.util
 import time
 import random
 import os
-import io
-import json  
+import threading
+import uuid
+from contextlib import contextmanager
+from pdf_cache import PdfTextCache, content_key
+from pdf_extract import HAS_PDF, extract_text
+from retrieval import CHARS_PER_TOKEN, RetrievalIndex
+from syllabus import SYLLABUS, STATIC_QUESTIONS
+from quiz_generation import chapter_context, generate_questions_parallel, question_hash, stream_questions
+from llm_client import HAS_AI, LLMClient
+from llm_scheduler import PRIORITY_BACKGROUND, PRIORITY_STUDENT, PRIORITY_TEACHER, Overloaded, llm_caller
+from storage import Storage
+from data_store import DataStore
+from feedback_store import FeedbackStore
+from roster import RosterIndex
+from question_bank import BankKey, BankRefiller, QuestionBank
+from answer_cache import AnswerCache
+from tracing import Tracer
 
 # --- 1. CONFIGURATION ---
 st.set_page_config(
@@ -18,17 +30,10 @@ st.set_page_config(
 )
 
 # --- LIBRARY CHECKS ---
-try:
-    import google.generativeai as genai
-    HAS_AI = True
-except ImportError:
-    HAS_AI = False
-
-try:
-    import PyPDF2
-    HAS_PDF = True
-except ImportError:
-    HAS_PDF = False
+# Availability only; pandas, plotly, pyarrow, google.generativeai and PyPDF2
+# are imported by the pages and helpers that use them, not at startup.
+# HAS_AI comes from llm_client and HAS_PDF from pdf_extract.
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
 
 # --- 2. CUSTOM CSS ---
 st.markdown("""
@@ -41,33 +46,51 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- 3. DATA & SYLLABUS ---
-SYLLABUS = {
-    "Engineering Physics": {"chapters": ["Fundamentals of Photonics", "Quantum Physics", "Wave Optics", "Semiconductor Physics"]},
-    "Engineering Chemistry": {"chapters": ["Water Technology", "Instrumental Methods", "Advanced Materials", "Corrosion"]},
-    "Basic Electrical Engineering": {"chapters": ["DC Circuits", "AC Fundamentals", "Electric Machines"]},
-    "Engineering Mechanics": {"chapters": ["Force Systems", "Equilibrium", "Friction", "Kinematics"]},
-    "Engineering Graphics": {"chapters": ["Projections", "Curves", "Isometric Projection"]},
-    "Mathematics-I": {"chapters": ["Calculus", "Matrices", "Eigen Values"]},
-    "Programming": {"chapters": ["C Intro", "Control Flow", "Arrays", "Functions"]}
-}
-
-STATIC_QUESTIONS = {
-    "Default": [
-        {"q": "Which law states V=IR?", "opts": ["Ohm's Law", "Newton's Law", "Kirchhoff's Law", "Faraday's Law"], "ans": "Ohm's Law"},
-        {"q": "What is the unit of Force?", "opts": ["Newton", "Joule", "Watt", "Pascal"], "ans": "Newton"},
-        {"q": "Binary 1010 equals decimal...", "opts": ["10", "5", "12", "8"], "ans": "10"},
-        {"q": "Integral of x dx is...", "opts": ["x^2 / 2", "x^2", "2x", "1/x"], "ans": "x^2 / 2"},
-        {"q": "Power is defined as...", "opts": ["Rate of doing work", "Force x Distance", "Mass x Velocity", "None"], "ans": "Rate of doing work"}
-    ]
-}
+# SYLLABUS and STATIC_QUESTIONS are defined in syllabus.py
+PRACTICE_HASHES = {question_hash(q) for qs in STATIC_QUESTIONS.values() for q in qs}   # fallback questions, not about any chapter
 
 # --- 4. SESSION STATE & DATA PERSISTENCE ---
-DATA_FILE = "users_data.json"
+DATA_FILE = "users_data.json"    # legacy store, migrated into DB_FILE on first start
+DB_FILE = "users_data.db"
+DEFAULT_TEACHER = "teacher1"      # receives feedback for subjects no teacher owns
+FEEDBACK_PAGE_SIZE = 5
+RESULTS_DIR = "quiz_results"
+ROSTER_PAGE_SIZE = 25
+PDF_CACHE_DIR = ".pdf_cache"
+PDF_MAX_BYTES = 8 * 1024 * 1024   # cap on extracted text per document
+PDF_RANGE_TIMEOUT = 60            # seconds to wait for one page range
+CONTEXT_TOKEN_BUDGET = 3000       # max syllabus tokens sent with one AI request
+QUESTION_BANK_FILE = "question_bank.db"
+ANSWER_CACHE_FILE = "answer_cache.db"
+ANSWER_CACHE_TTL = 7 * 24 * 3600   # seconds a cached AI answer stays valid
+ANSWER_CACHE_ENTRIES = 5000        # least recently used answers are evicted beyond this
+TEACHING_CONTEXT_KEY = "teaching-context"   # answer-cache "document" for teacher tool prompts; exact matches only (they differ just by topic)
+LLM_TIMEOUT = 60                  # seconds per Gemini request
+LLM_RETRIES = 3
+MODELS_TTL = 600            # seconds before a key's model list is refreshed in the background
+LLM_MAX_CONCURRENT = 8      # Gemini calls in flight per server process (lowered automatically on quota errors)
+LLM_MAX_QUEUE = 100         # queued calls beyond this are shed; background refills are shed at half
+LLM_MAX_WAIT = 90           # seconds a student call may queue before it falls back
+AUTO_MODEL = "⚡ Auto (fastest)"
+ADMIN_USERS = {DEFAULT_TEACHER}   # see the performance panel in the sidebar
+TRACE_ENABLED = False       # hot-path timing; admins can switch it on at runtime
+TRACE_EXPORT_FILE = "traces.jsonl"
+TRACE_EXPORT_BYTES = 10 * 1024 * 1024   # rotate the export beyond this size
+TRACE_EXPORT_BACKUPS = 3
+
+@st.cache_resource
+def get_tracer():
+    # Process-wide: every session's spans feed the same histograms
+    return Tracer(TRACE_ENABLED, export_bytes=TRACE_EXPORT_BYTES, export_backups=TRACE_EXPORT_BACKUPS)
+
+@st.cache_resource
+def get_storage():
+    return Storage(DB_FILE, legacy_json=DATA_FILE)
 
 def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            return json.load(f)
+    storage = get_storage()
+    if not storage.is_empty():
+        return storage.load()
     else:
         dummy_students = {}
         for i in range(1, 9):
@@ -93,61 +116,204 @@ def load_data():
                 }
             }
         }
-        with open(DATA_FILE, "w") as f:
-            json.dump(default_data, f)
+        storage.upsert_many(default_data["students"], default_data["teachers"])
         return default_data
 
-def save_data(students, teachers):
-    with open(DATA_FILE, "w") as f:
-        json.dump({"students": students, "teachers": teachers}, f)
+@st.cache_resource
+def get_store():
+    # Process-wide: every session reads the same records and sees other sessions' writes
+    return DataStore(get_storage(), load_data(), tracer=get_tracer())
+
+@st.cache_resource
+def get_feedback_store():
+    store = get_store()
+    feedback = FeedbackStore(get_storage())
+    # One-time move of the old per-teacher feedback_comments lists into the feedback table
+    for username, teacher in store.list_teachers():
+        if 'feedback_comments' in teacher:
+            feedback.import_comments(username, teacher['feedback_comments'])
+            store.update_teacher(username, lambda t: t.pop('feedback_comments', None))
+    return feedback
+
+@st.cache_resource
+def get_results_store():
+    from results_store import ResultsStore
+    return ResultsStore(RESULTS_DIR)
+
+@st.cache_resource(max_entries=1)
+def get_roster(version):
+    # Rebuilt only when a student is added or their name, subjects or attendance change
+    with get_tracer().span("roster.build"):
+        return RosterIndex(get_store().list_students())
+
+def results_version():
+    return get_results_store().version if HAS_ARROW else 0
+
+@st.cache_resource
+def get_live_analytics():
+    # Scans the results store once, then folds in each flushed batch
+    from analytics import LiveAnalytics
+    return LiveAnalytics(get_results_store())
+
+@st.cache_resource(max_entries=1)
+def get_analytics(version):
+    # A new snapshot of the running totals only when the results store's version moves on
+    from analytics import ClassAnalytics
+    if not HAS_ARROW: return ClassAnalytics.empty()
+    with get_tracer().span("analytics.build"):
+        return get_live_analytics().current()
+
+@st.cache_resource(max_entries=4)
+def class_figures(version):
+    import plotly.express as px
+    a = get_analytics(version)
+    with get_tracer().span("charts.class"):
+        avg_df = a.subject_average.rename("Score").rename_axis("Subject").reset_index()
+        fig1 = px.bar(avg_df, x="Subject", y="Score", title="Class Quiz Average", color="Score")
+        dist_df = a.pass_distribution.rename("Count").rename_axis("Status").reset_index()
+        fig2 = px.pie(dist_df, values='Count', names='Status', title="Pass Rate Distribution")
+    return fig1, fig2
+
+@st.cache_resource(max_entries=16)
+def concept_figure(version, subject):
+    import plotly.express as px
+    analytics = get_analytics(version)
+    with get_tracer().span("charts.concept", subject=subject):
+        concept_data = analytics.chapters_for(subject).rename(columns={"chapter": "Concept", "understanding": "Understanding (%)"})
+        return px.bar(concept_data, x="Understanding (%)", y="Concept", orientation='h',
+                      title="Class Average per Concept", color="Understanding (%)",
+                      color_continuous_scale="RdYlGn", range_color=[0, 100])
+
+def record_attempt(quiz, answers, score):
+    with get_tracer().span("results.record", questions=len(quiz['questions'])):
+        username = st.session_state.username
+        # Practice questions would count against the chosen chapter's understanding; only its own questions are recorded
+        graded = [(question_hash(q), answers.get(i), answers.get(i) == q['ans']) for i, q in enumerate(quiz['questions'])]
+        graded = [g for g in graded if g[0] not in PRACTICE_HASHES]
+        if HAS_ARROW and graded:
+            get_results_store().record_attempt(
+                username, quiz['subject'], quiz['chapter'], quiz.get('difficulty', "Medium"), graded,
+            )
+        # Latest percentage per subject, so the student record carries a summary too
+        pct = round(100 * score / len(quiz['questions'])) if quiz['questions'] else 0
+        get_store().update_student(username, lambda s: s.update(marks={**s.get('marks', {}), quiz['subject']: pct}, has_data=True))
+
+def submit_feedback(subject, rating, comment, student):
+    with get_tracer().span("feedback.submit", subject=subject):
+        owners = get_storage().teachers_by_subject(subject)
+        if not owners and get_store().get_teacher(DEFAULT_TEACHER): owners = [DEFAULT_TEACHER]
+        feedback = get_feedback_store()
+        feedback.add(owners, subject, rating, comment, student)
+        for owner in owners:
+            mean = feedback.stats(owner)['mean']
+            get_store().update_teacher(owner, lambda t: t.update(feedback_score=round(mean, 2)))
 
-if 'app_data' not in st.session_state:
-    st.session_state.app_data = load_data()
-    
-if 'students_data' not in st.session_state:
-    st.session_state.students_data = st.session_state.app_data['students']
-if 'teachers_data' not in st.session_state:
-    st.session_state.teachers_data = st.session_state.app_data['teachers']
 if 'logged_in' not in st.session_state: st.session_state.logged_in = False
 if 'user_type' not in st.session_state: st.session_state.user_type = None
 if 'username' not in st.session_state: st.session_state.username = None
 if 'current_page' not in st.session_state: st.session_state.current_page = 'login'
 if 'api_key' not in st.session_state: st.session_state.api_key = ""
-if 'selected_model' not in st.session_state: st.session_state.selected_model = "gemini-1.5-flash"
+if 'selected_model' not in st.session_state: st.session_state.selected_model = AUTO_MODEL
 if 'teacher_page' not in st.session_state: st.session_state.teacher_page = "dashboard"
+if 'session_id' not in st.session_state: st.session_state.session_id = uuid.uuid4().hex[:8]
+
+def cancel_stream():
+    # Stops any AI response still streaming into the page we are leaving
+    event = st.session_state.get('stream_cancel')
+    if event is not None: event.set()
 
 def navigate_to(page):
+    cancel_stream()
     st.session_state.current_page = page
     st.rerun()
 
+def switch_teacher_page(page):
+    cancel_stream()
+    st.session_state.teacher_page = page
+    st.session_state.feedback_cursor = None
+    st.rerun()
+
 # --- 5. HELPER FUNCTIONS ---
-@st.cache_data
 def get_available_models(api_key):
     if not api_key or not HAS_AI: return []
+    return get_llm_client().available_models(api_key)
+
+@st.cache_resource
+def get_llm_client():
+    # Shared by every session: configured models are reused per (key, model),
+    # and its registry learns which model answers fastest
+    return LLMClient(timeout=LLM_TIMEOUT, retries=LLM_RETRIES, models_ttl=MODELS_TTL,
+                     max_concurrent=LLM_MAX_CONCURRENT, max_queue=LLM_MAX_QUEUE, max_wait=LLM_MAX_WAIT,
+                     tracer=get_tracer())
+
+def ai_target():
+    # (api_key, model_name) for AI calls, or None when AI is off. A model_name
+    # of None lets the registry route to the fastest healthy model.
+    api_key = st.session_state.get('api_key')
+    model_name = st.session_state.get('selected_model')
+    if not (api_key and HAS_AI and model_name): return None
+    return api_key, (None if model_name == AUTO_MODEL else model_name)
+
+@contextmanager
+def ai_caller():
+    # Attributes Gemini calls to this user for fair queueing (teacher tools go
+    # first) and shows the queue position while a call waits for a slot
+    priority = PRIORITY_TEACHER if st.session_state.user_type == "teacher" else PRIORITY_STUDENT
+    notice = st.empty()
+    def on_wait(position, eta):
+        notice.info(f"⏳ The AI is busy: you are #{position} in the queue (about {eta:.0f}s).")
     try:
-        genai.configure(api_key=api_key)
-        models = []
-        for m in genai.list_models():
-            if 'generateContent' in m.supported_generation_methods:
-                if 'gemini' in m.name:
-                    models.append(m.name)
-        return models
-    except:
-        return []
+        with llm_caller(st.session_state.username, priority, on_wait):
+            yield
+    finally:
+        notice.empty()
+
+@st.cache_resource
+def get_pdf_cache():
+    # One cache per server process, shared by every session
+    return PdfTextCache(PDF_CACHE_DIR)
+
+def _parse_pdf_bytes(data):
+    # Only runs on a PDF cache miss, so "pdf.parse" vs "pdf.extract" shows what the cache saves
+    with get_tracer().span("pdf.parse", pdf_bytes=len(data)) as span:
+        text = extract_text(data, max_bytes=PDF_MAX_BYTES, timeout=PDF_RANGE_TIMEOUT)
+        span.set(text_chars=len(text))
+        return text
 
 def extract_pdf_text(uploaded_file):
     if not HAS_PDF: return "ERROR: PyPDF2 library not installed. Please install it to read PDFs."
+    data = uploaded_file.getvalue()
     try:
-        reader = PyPDF2.PdfReader(uploaded_file)
-        text = ""
-        for page in reader.pages:
-            extracted_text = page.extract_text()
-            if extracted_text:
-                text += extracted_text + "\n"
-        return text
+        with get_tracer().span("pdf.extract", pdf_bytes=len(data)):
+            return get_pdf_cache().get_or_compute(data, _parse_pdf_bytes, variant=f"max_bytes={PDF_MAX_BYTES}")
     except Exception as e:
         return f"Error reading PDF: {e}"
 
+@st.cache_resource(max_entries=32)
+def get_retrieval_index(doc_key, _text):
+    # Built once per distinct document; the leading underscore keeps Streamlit from hashing the text
+    with get_tracer().span("retrieval.index", text_chars=len(_text)):
+        return RetrievalIndex(_text)
+
+@st.cache_resource
+def get_question_bank():
+    return QuestionBank(QUESTION_BANK_FILE)
+
+@st.cache_resource
+def get_answer_cache():
+    return AnswerCache(ANSWER_CACHE_FILE, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_ENTRIES)
+
+@st.cache_resource
+def get_bank_refiller():
+    return BankRefiller(get_question_bank())
+
+def pdf_context(uploaded_file, query=None, token_budget=CONTEXT_TOKEN_BUDGET):
+    pdf_text = extract_pdf_text(uploaded_file)
+    if pdf_text.startswith(("ERROR:", "Error reading PDF:")): return pdf_text
+    index = get_retrieval_index(content_key(uploaded_file.getvalue()), pdf_text)
+    if not len(index): return pdf_text[:token_budget * CHARS_PER_TOKEN]
+    return index.search(query, token_budget) if query else index.overview(token_budget)
+
 # --- 6. SIDEBAR ---
 def render_sidebar():
     with st.sidebar:
@@ -172,71 +338,202 @@ def render_sidebar():
                     if HAS_PDF: st.success("✅ PDF Reader Active")
                     else: st.error("❌ PDF Reader Missing")
                     
-                    default_idx = 0
-                    for i, m in enumerate(valid_models):
-                        if 'flash' in m: default_idx = i; break
-                    st.session_state.selected_model = st.selectbox("Select AI Model", valid_models, index=default_idx)
+                    options = [AUTO_MODEL] + valid_models
+                    current = st.session_state.selected_model
+                    default_idx = options.index(current) if current in options else 0
+                    st.session_state.selected_model = st.selectbox("Select AI Model", options, index=default_idx,
+                                                                   help="Auto routes each request to the fastest healthy model. A selected model is still swapped out while it is slow or over quota.")
+                    model_stats = get_llm_client().registry.stats()
+                    for name, ms in model_stats.items():
+                        p50 = f"{ms['p50']:.1f}s" if ms['p50'] is not None else "–"
+                        p95 = f"{ms['p95']:.1f}s" if ms['p95'] is not None else "–"
+                        st.caption(f"📈 {name.split('/')[-1]}: p50 {p50} · p95 {p95} · errors {ms['error_rate']:.0%} ({ms['calls']} calls)")
+                    queue = get_llm_client().scheduler.stats()
+                    st.caption(f"🚦 AI queue: {queue['active']} running / {queue['queued']} waiting (limit {queue['limit']}, {queue['shed']} shed)")
                 else:
                     st.warning("⚠️ Key invalid or quota exceeded.")
             else:
                 st.info("Paste Key to enable AI")
+            
+            if HAS_PDF:
+                stats = get_pdf_cache().stats()
+                st.caption(f"📄 PDF cache: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+            if st.session_state.api_key:
+                stats = get_answer_cache().stats()
+                st.caption(f"💬 Answer cache: {stats['entries']} answers, {stats['hits'] + stats['near_hits']} hits ({stats['near_hits']} near) / {stats['misses']} misses")
+        
+        if st.session_state.user_type == "teacher" and st.session_state.username in ADMIN_USERS:
+            performance_panel()
         
         st.markdown("---")
         if st.session_state.logged_in:
             if st.button("🚪 Logout", use_container_width=True):
+                cancel_stream()
                 st.session_state.logged_in = False
                 st.session_state.current_page = 'login'
                 st.rerun()
 
+def performance_panel():
+    # Admin only. The switches apply to the whole server process, not just this session.
+    tracer = get_tracer()
+    with st.expander("⏱️ Performance"):
+        tracer.enabled = st.toggle("Record timings", value=tracer.enabled,
+                                   help="Times PDF reads, AI calls, saves and chart builds for every session.")
+        export = st.toggle("Export to JSONL", value=tracer.export_path is not None, disabled=not tracer.enabled,
+                           help=f"Appends each span to {TRACE_EXPORT_FILE}, rotated every {TRACE_EXPORT_BYTES // 2**20} MB.")
+        tracer.set_export(TRACE_EXPORT_FILE if export and tracer.enabled else None)
+        
+        stats = tracer.stats()
+        if not stats:
+            st.caption("No timings recorded yet." if tracer.enabled else "Timing is off.")
+            return
+        st.dataframe([{
+            "Span": name, "Calls": h['calls'], "p50 ms": round(h['p50_ms']), "p95 ms": round(h['p95_ms']), "Max ms": round(h['max_ms']),
+            "Prompt chars": round(h['mean_prompt_chars']) if 'mean_prompt_chars' in h else None,
+            "Response KB": round(h['mean_response_bytes'] / 1024, 1) if 'mean_response_bytes' in h else None,
+        } for name, h in stats.items()], hide_index=True)
+        
+        sessions = tracer.sessions()
+        if sessions:
+            labels = {}
+            for sid in sessions:
+                user = (tracer.session_stats(sid) or {}).get('user') or "logged out"
+                labels[f"{user} · {sid}" + (" (you)" if sid == st.session_state.session_id else "")] = sid
+            info = tracer.session_stats(labels[st.selectbox("Session", list(labels))])
+            if info:
+                st.caption(f"{info['reruns']} reruns. Previous rerun:")
+                for name, ms, attrs in info['last']:
+                    st.caption(f"· {name}: {ms:.0f} ms" + (f" ({attrs['page']})" if 'page' in attrs else ""))
+                st.caption("Totals: " + ", ".join(f"{name} {t['total_ms'] / 1000:.1f}s/{t['calls']}" for name, t in
+                                                  sorted(info['totals'].items(), key=lambda kv: -kv[1]['total_ms'])))
+        if st.button("Reset timings"): tracer.reset()
+
 # --- 7. AI FUNCTIONS ---
-def get_ai_questions(context_text, count=5, difficulty="Medium"):
-    api_key = st.session_state.get('api_key')
-    model_name = st.session_state.get('selected_model')
+def stream_ai_questions(context_text, count=5, difficulty="Medium"):
+    # Yields each question as soon as it parses; static questions make up any shortfall
+    target = ai_target()
+    seen = set()
     
-    if api_key and HAS_AI and model_name:
+    if target:
         try:
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(model_name)
-            
-            safe_context = context_text 
-            
-            prompt = f"""
-            You are a strict Engineering Professor. Generate {count} multiple-choice questions (MCQs).
-            STRICTLY base the questions ONLY on the concepts, formulas, and topics found in the following syllabus text:
-            
-            "{safe_context}"
-            
-            Difficulty Level: {difficulty}.
-            Do NOT ask generic or meta questions like "What is the subject about?". 
-            Ask highly technical questions regarding the actual engineering principles inside the chapter.
-            
-            Strictly return a Python list of dictionaries. NO markdown.
-            Format: [{{'q': 'Question Text', 'opts': ['A', 'B', 'C', 'D'], 'ans': 'Correct Option Text'}}]
-            """
-            
-            response = model.generate_content(prompt)
-            text = response.text.strip().replace("```python", "").replace("```", "")
-            import ast
-            return ast.literal_eval(text)
+            with ai_caller(), get_tracer().span("quiz.generate", requested=count) as span:
+                for q in stream_questions(get_llm_client().bind(*target), context_text, count, difficulty):
+                    if not seen: span.set(first_question_ms=span.elapsed_ms())
+                    seen.add(question_hash(q))
+                    yield q
+                span.set(questions=len(seen))
+        except Overloaded as e:
+            st.warning(f"⏳ {e} Showing practice questions instead.")
         except Exception as e:
-            st.error(f"AI Error ({model_name}): {str(e)}")
-            
-    return random.sample(STATIC_QUESTIONS["Default"], min(count, 5))
+            st.error(f"AI Error ({st.session_state.get('selected_model')}): {str(e)}")
+    
+    spare = [q for q in STATIC_QUESTIONS["Default"] if question_hash(q) not in seen]
+    yield from random.sample(spare, max(0, min(count - len(seen), len(spare))))
 
-def get_ai_answer(question, context_text):
-    api_key = st.session_state.get('api_key')
-    model_name = st.session_state.get('selected_model')
+def make_question_generator(context_text, difficulty):
+    # Captures the key/model now so the refill thread never touches session state
+    target = ai_target()
+    if not target: return None
+    
+    llm = get_llm_client().bind(*target)
+    def generate(count):
+        with llm_caller("question-bank", PRIORITY_BACKGROUND):
+            return generate_questions_parallel(llm, context_text, count, difficulty)
+    return generate
+
+def request_refill(key, context_text):
+    generate = make_question_generator(context_text, key.difficulty)
+    refiller = get_bank_refiller()
+    if generate and refiller.needs_refill(key): refiller.request(key, generate)
+
+def draw_quiz(key, context_text, count=5):
+    # Returns the questions the bank can serve now, plus a generator that
+    # streams the shortfall (None when the bank covered the whole quiz).
+    # Questions from other copies of the syllabus fill in before anything waits on Gemini.
+    bank = get_question_bank()
+    qs = bank.draw(key, count)
+    if len(qs) < count:
+        seen = {question_hash(q) for q in qs}
+        qs += [q for q in bank.draw(key, count, other_documents=True) if question_hash(q) not in seen][:count - len(qs)]
+    if len(qs) >= count:
+        request_refill(key, context_text)
+        return qs, None
+    return qs, stream_shortfall(key, context_text, qs, count)
+
+def stream_shortfall(key, context_text, qs, count):
+    # The bank is already exhausted for this chapter: generate the rest, then fall back to practice questions
+    bank = get_question_bank()
+    seen = {question_hash(q) for q in qs}
+    new_qs = []
     
-    if api_key and HAS_AI and model_name:
+    target = ai_target()
+    if target:
+        # Cold pool: generate only the missing questions now, the refiller tops up the rest
+        llm = get_llm_client().bind(*target)
         try:
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(model_name)
-            safe_context = context_text 
-            res = model.generate_content(f"Context: {safe_context}\n\nQuestion: {question}")
-            return res.text
+            with ai_caller(), get_tracer().span("quiz.generate", requested=count - len(qs)) as span:
+                for q in stream_questions(llm, context_text, count - len(qs), key.difficulty):
+                    if question_hash(q) in seen: continue
+                    if not new_qs: span.set(first_question_ms=span.elapsed_ms())
+                    seen.add(question_hash(q))
+                    new_qs.append(q)
+                    yield q
+                span.set(questions=len(new_qs))
+        except Overloaded as e:
+            st.warning(f"⏳ {e} Filling the quiz from the question bank.")
         except Exception as e:
-            return f"Error: {str(e)}"
-    return "⚠️ AI Features Disabled"
+            st.error(f"AI Error ({st.session_state.get('selected_model')}): {str(e)}")
+        finally:
+            bank.add(key, new_qs)
+        request_refill(key, context_text)
+    
+    missing = count - len(qs) - len(new_qs)
+    spare = [q for q in STATIC_QUESTIONS["Default"] if question_hash(q) not in seen]
+    yield from random.sample(spare, max(0, min(missing, len(spare))))
+
+def stream_ai_answer(question, context_text, doc_key=None, near=True):
+    # Generator for st.write_stream. With a doc_key, answers are served from and
+    # saved to the answer cache; ``near`` also allows similarly worded questions to match.
+    target = ai_target()
+    
+    if not target:
+        yield "⚠️ AI Features Disabled"
+        return
+    
+    cache = get_answer_cache() if doc_key else None
+    cached = cache.get(doc_key, question, near=near) if cache else None
+    st.session_state.cached_answer = cached
+    if cached:
+        yield cached.answer
+        return
+    
+    cancel_stream()
+    cancel = st.session_state.stream_cancel = threading.Event()
+    parts = []
+    try:
+        with ai_caller():
+            for chunk in get_llm_client().stream(*target, f"Context: {context_text}\n\nQuestion: {question}", cancel=cancel):
+                parts.append(chunk)
+                yield chunk
+    except Overloaded as e:
+        yield f"⏳ {e}"
+    except Exception as e:
+        yield f"\n\nError: {str(e)}"
+    else:
+        if cache and parts and not cancel.is_set(): cache.put(doc_key, question, "".join(parts))
+
+def regenerate_answer(entry_id, flag):
+    # Drops the cached answer that was just shown and asks the page to answer again
+    get_answer_cache().remove(entry_id)
+    st.session_state[flag] = True
+
+def write_answer(question, context_text, doc_key, flag, near=True):
+    st.write_stream(stream_ai_answer(question, context_text, doc_key, near))
+    cached = st.session_state.pop('cached_answer', None)
+    if cached:
+        c1, c2 = st.columns([3, 1])
+        c1.caption("⚡ Answered from cache" + (f" (similar question: \"{cached.question}\")" if cached.near else ""))
+        c2.button("🔄 Regenerate", key=f"regen_{flag}", on_click=regenerate_answer, args=(cached.id, flag))
 
 # --- 8. PAGES ---
 def login_register_page():
@@ -248,7 +545,7 @@ def login_register_page():
         role = st.radio("Role:", ["Student", "Teacher"], horizontal=True)
         u, p = st.text_input("Username"), st.text_input("Password", type="password")
         if st.button("Login", use_container_width=True):
-            db = st.session_state.students_data if role == "Student" else st.session_state.teachers_data
+            db = get_store().students if role == "Student" else get_store().teachers
             if u in db and db[u]["password"] == p:
                 st.session_state.logged_in = True
                 st.session_state.user_type = role.lower()
@@ -265,23 +562,22 @@ def login_register_page():
         
         if st.button("Create Account"):
             if reg_user and reg_pass:
-                target_db = st.session_state.teachers_data if reg_role == "Teacher" else st.session_state.students_data
-                if reg_user in target_db:
+                if reg_role == "Student":
+                    record = {"password": reg_pass, "name": reg_name, "subjects": list(SYLLABUS.keys()), "marks": {}, "attendance": 0, "has_data": False}
+                else:
+                    record = {"password": reg_pass, "name": reg_name, "subject": "General", "feedback_score": 0.0}
+                
+                # The insert is the uniqueness check, so two sessions can't claim the same username
+                if not get_store().add_user(reg_role.lower(), reg_user, record):
                     st.error("Username already exists!")
                 else:
-                    if reg_role == "Student":
-                        target_db[reg_user] = {"password": reg_pass, "name": reg_name, "subjects": list(SYLLABUS.keys()), "marks": {}, "attendance": 0, "has_data": False}
-                    else:
-                        target_db[reg_user] = {"password": reg_pass, "name": reg_name, "subject": "General", "feedback_score": 0.0, "feedback_comments": []}
-                    
-                    save_data(st.session_state.students_data, st.session_state.teachers_data)
                     st.success("Account Created & Saved! Please switch to the Login tab.")
             else:
                 st.warning("Please fill in all fields.")
 
 def student_dashboard():
     st.title("🎯 Student Dashboard")
-    subjects = st.session_state.students_data[st.session_state.username].get('subjects', [])
+    subjects = get_store().get_student(st.session_state.username).get('subjects', [])
     if not subjects: subjects = list(SYLLABUS.keys())
         
     st.info(f"Subjects Enrolled: {', '.join(subjects)}")
@@ -296,7 +592,7 @@ def assessment_setup():
     st.title("📝 Setup Quiz")
     if st.button("Back"): navigate_to("student_dashboard")
     
-    subjects = st.session_state.students_data[st.session_state.username].get('subjects', [])
+    subjects = get_store().get_student(st.session_state.username).get('subjects', [])
     if not subjects: subjects = list(SYLLABUS.keys())
     
     sub = st.selectbox("Subject", subjects)
@@ -310,13 +606,51 @@ def assessment_setup():
             st.warning("⚠️ Please upload your Syllabus PDF first to get precise chapter questions.")
         else:
             with st.spinner("Reading Syllabus & Generating Precise Questions..."):
-                pdf_text = extract_pdf_text(syl_file)
-                context = f"Subject: {sub}, Chapter: {chap}.\nFind the specific section for this subject and chapter in the following syllabus text, and generate questions ONLY from those exact topics:\n\n{pdf_text}"
+                excerpt = pdf_context(syl_file, f"{sub} {chap}")
+                context = chapter_context(sub, chap, excerpt)
                 
-                qs = get_ai_questions(context, 5, "Medium")
-                st.session_state.quiz_session = {'subject': sub, 'chapter': chap, 'questions': qs}
+                key = BankKey(sub, chap, "Medium", content_key(syl_file.getvalue()))
+                qs, pending = draw_quiz(key, context, 5)
+                # Anything the bank could not serve streams in on the quiz page
+                st.session_state.quiz_session = {'subject': sub, 'chapter': chap, 'difficulty': "Medium", 'questions': qs, 'pending': pending}
                 navigate_to("quiz_interface")
 
+# Quiz and dashboard widgets live in st.fragment functions: an answer click,
+# slider move or student pick reruns only its own fragment instead of the
+# sidebar, the other questions and every chart on the page.
+@st.fragment
+def quiz_questions(quiz):
+    def show_question(i, q):
+        st.markdown(f"**Q{i+1}: {q['q']}**")
+        st.radio(f"Select Answer {i+1}:", q['opts'], key=f"q{i}", index=None)
+        st.markdown("---")
+    
+    for i, q in enumerate(quiz['questions']):
+        show_question(i, q)
+    
+    if quiz.get('pending') is not None:
+        # Render each generated question as soon as it parses; a rerun mid-stream resumes here
+        resumed = quiz.get('streaming', False)
+        quiz['streaming'] = True
+        streamed = st.container()
+        status = st.empty()
+        status.caption("⏳ Generating more questions...")
+        for q in quiz['pending']:
+            quiz['questions'].append(q)
+            with streamed: show_question(len(quiz['questions']) - 1, q)
+        quiz['pending'] = None
+        quiz['streaming'] = False
+        status.empty()
+        # A run that was cut short never drew the feedback form and submit button outside this fragment
+        if resumed: st.rerun()
+
+@st.fragment
+def quiz_feedback_form():
+    st.subheader("📝 Quick Feedback (Optional)")
+    st.slider("Rate the clarity of this quiz (1-Poor, 5-Excellent)", 1, 5, 4, key="quiz_feedback_rating")
+    st.text_input("Any concepts you struggled with?", placeholder="e.g., I didn't understand the third question...", key="quiz_feedback_comment")
+    st.markdown("---")
+
 def quiz_interface():
     if 'quiz_session' not in st.session_state: 
         navigate_to("student_dashboard")
@@ -325,33 +659,23 @@ def quiz_interface():
     quiz = st.session_state.quiz_session
     st.header(f"{quiz['subject']}")
     
-    answers = {}
-    for i, q in enumerate(quiz['questions']):
-        st.markdown(f"**Q{i+1}: {q['q']}**")
-        answers[i] = st.radio(f"Select Answer {i+1}:", q['opts'], key=f"q{i}", index=None)
-        st.markdown("---")
-        
-    # --- NEW ADDITION: Feedback Option ---
-    st.subheader("📝 Quick Feedback (Optional)")
-    feedback_rating = st.slider("Rate the clarity of this quiz (1-Poor, 5-Excellent)", 1, 5, 4)
-    feedback_comment = st.text_input("Any concepts you struggled with?", placeholder="e.g., I didn't understand the third question...")
-    st.markdown("---")
-    # -------------------------------------
+    quiz_questions(quiz)
+    if quiz.get('pending') is not None: return
+    quiz_feedback_form()
     
     if st.button("Submit Assessment"):
+        answers = {i: st.session_state.get(f"q{i}") for i in range(len(quiz['questions']))}
         score = sum([1 for i, q in enumerate(quiz['questions']) if answers.get(i) == q['ans']])
         st.success(f"Score: {score}/{len(quiz['questions'])}")
+        record_attempt(quiz, answers, score)
         
-        # Save feedback data to the teacher's profile
+        # Route feedback to the teacher(s) who own this subject
+        feedback_rating = st.session_state.get('quiz_feedback_rating', 4)
+        feedback_comment = st.session_state.get('quiz_feedback_comment', "")
         if feedback_comment or feedback_rating:
-            if 'feedback_comments' not in st.session_state.teachers_data['teacher1']:
-                st.session_state.teachers_data['teacher1']['feedback_comments'] = []
-            st.session_state.teachers_data['teacher1']['feedback_comments'].append({
-                "rating": feedback_rating,
-                "comment": feedback_comment if feedback_comment else "Completed assessment without comments.",
-                "subject": quiz['subject']
-            })
-            save_data(st.session_state.students_data, st.session_state.teachers_data)
+            submit_feedback(quiz['subject'], feedback_rating,
+                            feedback_comment if feedback_comment else "Completed assessment without comments.",
+                            st.session_state.username)
             
         time.sleep(2)
         st.session_state.current_page = 'student_dashboard'
@@ -366,12 +690,13 @@ def student_ai():
     with tab1:
         uploaded = st.file_uploader("Upload PDF", type="pdf", key="chat_pdf")
         q = st.text_input("Question")
-        if st.button("Ask"):
+        if st.button("Ask") or st.session_state.pop('regen_ask', False):
             if not uploaded: st.error("Upload PDF first")
             else:
-                with st.spinner("Reading & Thinking..."):
-                    pdf_text = extract_pdf_text(uploaded)
-                    st.info(get_ai_answer(q, pdf_text))
+                with st.spinner("Reading PDF..."):
+                    context = pdf_context(uploaded, q)
+                with st.container(border=True):
+                    write_answer(q, context, content_key(uploaded.getvalue()), 'regen_ask')
                     
     with tab2:
         st.subheader("Generate Quiz from File")
@@ -382,71 +707,162 @@ def student_ai():
             if not q_file:
                 st.error("Please upload a file first.")
             else:
+                with st.spinner("Reading PDF..."):
+                    pdf_text = pdf_context(q_file)
+                context_with_diff = f"Content: {pdf_text}\n\n IMPORTANT: Generate {difficulty} level questions."
                 with st.spinner(f"Creating {difficulty} Quiz..."):
-                    pdf_text = extract_pdf_text(q_file)
-                    context_with_diff = f"Content: {pdf_text}\n\n IMPORTANT: Generate {difficulty} level questions."
-                    qs = get_ai_questions(context_with_diff, 3, difficulty)
-                    for i, q in enumerate(qs):
+                    for i, q in enumerate(stream_ai_questions(context_with_diff, 3, difficulty)):
                         st.markdown(f"**Q{i+1}: {q['q']}**")
                         st.caption(f"Answer: {q['ans']}")
                         st.divider()
 
+@st.fragment
+def student_analysis():
+    # Search, paging and the student picker rerun only this section, not the class charts above
+    analytics = get_analytics(results_version())
+    st.subheader("🧑‍🎓 Individual Student Analysis")
+    roster = get_roster(get_store().roster_version)
+    
+    if len(roster):
+        f1, f2, f3 = st.columns([2, 1, 1])
+        reset_page = lambda: st.session_state.update(roster_page=0)
+        search = f1.text_input("Search by name or username", key="roster_search", on_change=reset_page)
+        subject_filter = f2.selectbox("Subject", ["All"] + list(SYLLABUS.keys()), key="roster_subject", on_change=reset_page)
+        att_range = f3.slider("Attendance (%)", 0, 100, (0, 100), key="roster_attendance", on_change=reset_page)
+        
+        filters = dict(subject=None if subject_filter == "All" else subject_filter,
+                       attendance=None if att_range == (0, 100) else att_range, page_size=ROSTER_PAGE_SIZE)
+        page = st.session_state.get('roster_page', 0)
+        ids, total = roster.search(search, page=page, **filters)
+        last_page = max(0, (total - 1) // ROSTER_PAGE_SIZE)
+        if page > last_page:
+            # Filters narrowed the results; jump back to the last page that exists
+            page = st.session_state.roster_page = last_page
+            ids, _ = roster.search(search, page=page, **filters)
+        
+        p1, p2, p3 = st.columns([1, 2, 1])
+        if p1.button("⬅️ Prev", disabled=page == 0): st.session_state.roster_page = page - 1; st.rerun(scope="fragment")
+        p2.caption(f"{total} matching students · page {page + 1} of {last_page + 1}")
+        if p3.button("Next ➡️", disabled=page >= last_page): st.session_state.roster_page = page + 1; st.rerun(scope="fragment")
+    else:
+        ids = []
+    
+    if ids:
+        # Options are roster ids, so students who share a name stay distinguishable
+        selected_id = st.selectbox("Select Student to View Profile", ids, format_func=roster.label)
+        selected_username = roster.usernames[selected_id]
+        student_info = get_store().get_student(selected_username)
+        
+        col_a, col_b = st.columns([1, 2])
+        with col_a:
+            att_val = student_info.get('attendance', 85)
+            st.metric(label="Current Attendance", value=f"{att_val}%", delta="-2%" if att_val < 75 else "+1%")
+            profile = analytics.student_profile(selected_username)
+            st.metric(label="Assessments Completed", value=profile['attempts'])
+        
+        with col_b:
+            st.write("#### Performance Breakdown")
+            subjects = student_info.get('subjects', list(SYLLABUS.keys())[:4])
+            
+            if profile['weakness']:
+                w_sub, w_pct, w_diff = profile['weakness']
+                s_sub, s_pct, s_diff = profile['strength']
+                st.error(f"📉 **Identified Weakness:** {w_sub} ({w_pct:.0f}%, {w_diff:+.0f} pts vs class average. Recommend assigning extra practice tests.)")
+                if s_sub != w_sub:
+                    st.success(f"📈 **Identified Strength:** {s_sub} ({s_pct:.0f}%, {s_diff:+.0f} pts vs class average.)")
+            elif len(subjects) > 0:
+                st.info("No assessments completed yet, so there is nothing to analyse.")
+            else:
+                st.info("Student hasn't enrolled in any subjects yet.")
+    elif len(roster):
+        st.info("No students match these filters.")
+    else:
+        st.warning("No students are currently registered in the system.")
+
+@st.fragment
+def weak_area_plan(weak):
+    # Action Plan for Weak Areas
+    st.write("### 🛠️ Solutions for Weak Areas")
+    if weak.empty:
+        st.info("No quiz attempts recorded yet for your chapters.")
+    else:
+        labels = ["Critical Weakness", "Secondary Weakness"]
+        for label, row in zip(labels, weak.itertuples()):
+            show = st.error if label == labels[0] else st.warning
+            show(f"**{label}:** {row.chapter} ({row.understanding:.0f}% Comprehension)")
+        
+        st.write("**Recommended Actions:**")
+        for i, row in enumerate(weak.itertuples(), 1):
+            st.write(f"{i}. **{row.chapter}:** Assign targeted practice quizzes and a short recap of the core principles.")
+        st.write(f"{len(weak) + 1}. **General:** Host a Q&A session this Friday focusing on these chapters.")
+        
+        if st.button("Generate AI Remedial Plan") or st.session_state.pop('regen_remedial', False):
+            st.success("Plan Generated:")
+            topics = " and ".join(weak['chapter'])
+            write_answer(f"Generate a 3-step remedial lesson plan for engineering students struggling with {topics}.", "Teaching Context",
+                         TEACHING_CONTEXT_KEY, 'regen_remedial', near=False)
+
+@st.fragment
+def feedback_comments():
+    # Paging through comments reruns only this list
+    st.write("### 💬 Recent Student Comments")
+    feedback = get_feedback_store()
+    stats = feedback.stats(st.session_state.username)
+    
+    if not stats['count']:
+        st.info("No feedback received yet.")
+    else:
+        m1, m2 = st.columns(2)
+        m1.metric("Responses", stats['count'])
+        m2.metric("Average Rating", f"{stats['mean']:.2f} / 5")
+        if stats['subjects']:
+            import pandas as pd
+            hist_df = pd.DataFrame({sub: s['histogram'] for sub, s in stats['subjects'].items()}, index=[f"{r}⭐" for r in range(1, 6)])
+            st.bar_chart(hist_df)
+        
+        # Newest first, one keyset page at a time
+        cursor = st.session_state.get('feedback_cursor')
+        comments, next_cursor = feedback.latest(st.session_state.username, FEEDBACK_PAGE_SIZE, before_id=cursor)
+        for c in comments:
+            rating = c.get('rating', 5)
+            comment_text = c.get('comment') or 'No specific comment provided.'
+            st.info(f"⭐ {rating}/5 - {comment_text}")
+        
+        p1, p2 = st.columns(2)
+        if cursor is not None and p1.button("⬅️ Newest"):
+            st.session_state.feedback_cursor = None; st.rerun(scope="fragment")
+        if next_cursor is not None and p2.button("Older ➡️"):
+            st.session_state.feedback_cursor = next_cursor; st.rerun(scope="fragment")
+
 def teacher_dashboard():
     st.title("👨‍🏫 Teacher Dashboard")
-    st.write(f"Welcome, **{st.session_state.teachers_data[st.session_state.username]['name']}**")
+    st.write(f"Welcome, **{get_store().get_teacher(st.session_state.username)['name']}**")
     
     c1, c2, c3 = st.columns(3)
-    if c1.button("📊 Profiles"): st.session_state.teacher_page = "profiles"; st.rerun()
-    if c2.button("💬 Feedback"): st.session_state.teacher_page = "feedback"; st.rerun()
-    if c3.button("🤖 AI Tools"): st.session_state.teacher_page = "ai_tools"; st.rerun()
+    if c1.button("📊 Profiles"): switch_teacher_page("profiles")
+    if c2.button("💬 Feedback"): switch_teacher_page("feedback")
+    if c3.button("🤖 AI Tools"): switch_teacher_page("ai_tools")
 
     t_page = st.session_state.get("teacher_page", "dashboard")
     
     if t_page == "profiles":
         st.divider()
         st.subheader("📊 Class Performance Analytics")
+        version = results_version()
+        analytics = get_analytics(version)
+        if not analytics.rows: st.info("No quiz attempts recorded yet. Charts fill in as students submit assessments.")
+        fig1, fig2 = class_figures(version)
         c1, c2 = st.columns(2)
         with c1:
-            df = pd.DataFrame({"Student": ["A", "B", "C", "D", "E"], "Score": [85, 92, 78, 88, 72]})
-            fig1 = px.bar(df, x="Student", y="Score", title="Class Quiz Average", color="Score")
             st.plotly_chart(fig1, use_container_width=True)
         with c2:
-            df2 = pd.DataFrame({"Status": ["Pass", "Fail", "Borderline"], "Count": [45, 5, 10]})
-            fig2 = px.pie(df2, values='Count', names='Status', title="Pass Rate Distribution")
             st.plotly_chart(fig2, use_container_width=True)
             
         st.markdown("---")
         
-        st.subheader("🧑‍🎓 Individual Student Analysis")
-        student_usernames = list(st.session_state.students_data.keys())
-        student_display_names = [st.session_state.students_data[u]['name'] for u in student_usernames]
-        
-        if student_usernames:
-            selected_name = st.selectbox("Select Student to View Profile", student_display_names)
-            selected_username = student_usernames[student_display_names.index(selected_name)]
-            student_info = st.session_state.students_data[selected_username]
-            
-            col_a, col_b = st.columns([1, 2])
-            with col_a:
-                att_val = student_info.get('attendance', 85)
-                st.metric(label="Current Attendance", value=f"{att_val}%", delta="-2%" if att_val < 75 else "+1%")
-                st.metric(label="Assessments Completed", value=random.randint(2, 8))
-            
-            with col_b:
-                st.write("#### Performance Breakdown")
-                subjects = student_info.get('subjects', list(SYLLABUS.keys())[:4])
-                
-                if len(subjects) > 0:
-                    weakness = subjects[0]
-                    strength = subjects[-1] if len(subjects) > 1 else subjects[0]
-                    st.error(f"📉 **Identified Weakness:** {weakness} (Below class average. Recommend assigning extra practice tests.)")
-                    st.success(f"📈 **Identified Strength:** {strength} (Top 10% of class in recent quizzes.)")
-                else:
-                    st.info("Student hasn't enrolled in any subjects yet.")
-        else:
-            st.warning("No students are currently registered in the system.")
+        student_analysis()
 
-        if st.button("Close View"): st.session_state.teacher_page = "dashboard"; st.rerun()
+        if st.button("Close View"): switch_teacher_page("dashboard")
 
     # --- NEW ADDITION: Detailed Feedback Page ---
     elif t_page == "feedback":
@@ -456,72 +872,52 @@ def teacher_dashboard():
         st.write("### 🧠 Concept Understanding Breakdown")
         col_f1, col_f2 = st.columns(2)
         
+        # Teachers of a SYLLABUS subject see its chapters; "General" teachers see every chapter
+        version = results_version()
+        t_subject = get_store().get_teacher(st.session_state.username).get('subject')
+        if t_subject not in SYLLABUS: t_subject = None
+        weak = get_analytics(version).weakest_chapters(t_subject)
+        
         with col_f1:
             # Concept Understanding Graph
-            concept_data = pd.DataFrame({
-                "Concept": ["Quantum Physics", "Wave Optics", "Photonics", "Semiconductors"],
-                "Understanding (%)": [82, 45, 60, 90]
-            })
-            fig_concepts = px.bar(concept_data, x="Understanding (%)", y="Concept", orientation='h',
-                                  title="Class Average per Concept", color="Understanding (%)",
-                                  color_continuous_scale="RdYlGn")
-            st.plotly_chart(fig_concepts, use_container_width=True)
+            st.plotly_chart(concept_figure(version, t_subject), use_container_width=True)
             
         with col_f2:
-            # Action Plan for Weak Areas
-            st.write("### 🛠️ Solutions for Weak Areas")
-            st.error("**Critical Weakness:** Wave Optics (45% Comprehension)")
-            st.warning("**Secondary Weakness:** Fundamentals of Photonics (60% Comprehension)")
-            
-            st.write("**Recommended Actions:**")
-            st.write("1. **Wave Optics:** Assign interactive simulation labs for diffraction.")
-            st.write("2. **Photonics:** Provide a 15-minute recap video covering basic principles.")
-            st.write("3. **General:** Host a Q&A session this Friday focusing on these chapters.")
-            
-            if st.button("Generate AI Remedial Plan"):
-                with st.spinner("Generating detailed AI action plan..."):
-                    plan = get_ai_answer("Generate a 3-step remedial lesson plan for engineering students struggling with Wave Optics and Photonics.", "Teaching Context")
-                    st.success("Plan Generated:")
-                    st.markdown(plan)
+            weak_area_plan(weak)
 
         st.markdown("---")
         
         # Real-time Student Comments
-        st.write("### 💬 Recent Student Comments")
-        comments = st.session_state.teachers_data[st.session_state.username].get('feedback_comments', [])
-        
-        if not comments:
-            st.info("No feedback received yet.")
-        else:
-            # Loop through the latest 5 comments backwards (newest first)
-            for c in comments[::-1][:5]:
-                rating = c.get('rating', 5)
-                comment_text = c.get('comment', 'No specific comment provided.')
-                st.info(f"⭐ {rating}/5 - {comment_text}")
+        feedback_comments()
 
-        if st.button("Close View"): st.session_state.teacher_page = "dashboard"; st.rerun()
+        if st.button("Close View"): switch_teacher_page("dashboard")
     # ---------------------------------------------
 
     elif t_page == "ai_tools":
         st.divider()
         st.subheader("AI Content Generator")
         topic = st.text_input("Enter Topic for Lesson Plan")
-        if st.button("Generate Plan"):
-            with st.spinner("AI is working..."):
-                plan = get_ai_answer(f"Create a detailed lesson plan for {topic}", "Teaching Context")
-                st.markdown(plan)
-        if st.button("Close View"): st.session_state.teacher_page = "dashboard"; st.rerun()
+        if st.button("Generate Plan") or st.session_state.pop('regen_lesson', False):
+            write_answer(f"Create a detailed lesson plan for {topic}", "Teaching Context", TEACHING_CONTEXT_KEY, 'regen_lesson', near=False)
+        if st.button("Close View"): switch_teacher_page("dashboard")
+
+def current_page_name():
+    if not st.session_state.logged_in: return "login"
+    if st.session_state.user_type == "teacher": return f"teacher_{st.session_state.teacher_page}"
+    return st.session_state.current_page
 
 def main():
-    render_sidebar()
-    if not st.session_state.logged_in: login_register_page()
-    elif st.session_state.user_type == "student":
-        p = st.session_state.current_page
-        if p == 'student_dashboard': student_dashboard()
-        elif p == 'assessment_setup': assessment_setup()
-        elif p == 'quiz_interface': quiz_interface()
-        elif p == 'student_ai': student_ai()
-    elif st.session_state.user_type == "teacher": teacher_dashboard()
+    with get_tracer().rerun(st.session_state.session_id, st.session_state.username, current_page_name()):
+        get_store().sync()
+        render_sidebar()
+        if not st.session_state.logged_in: login_register_page()
+        elif st.session_state.user_type == "student":
+            p = st.session_state.current_page
+            if p == 'student_dashboard': student_dashboard()
+            elif p == 'assessment_setup': assessment_setup()
+            elif p == 'quiz_interface': quiz_interface()
+            elif p == 'student_ai': student_ai()
+        elif st.session_state.user_type == "teacher": teacher_dashboard()
 
 if __name__ == "__main__":
     main()
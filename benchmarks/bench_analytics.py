@@ -0,0 +1,93 @@
+"""Measure teacher dashboard analytics: full rebuild vs. per-flush update.
+
+Usage:
+    python benchmarks/bench_analytics.py [--students 50000] [--attempts 4] [--batch 200] [--flushes 10]
+
+Seeds a results store in a temporary directory with ``--attempts`` quiz
+attempts per student, then times:
+
+* ``full_rebuild``: build_analytics(), i.e. scan + to_pandas + group-bys
+  over the whole store (what every flush used to trigger).
+* ``live_start``: LiveAnalytics' one-off initial scan.
+* ``flush``: ResultsStore.flush() of ``--batch`` new attempts, which now
+  includes folding the batch into the running totals.
+* ``snapshot``: LiveAnalytics.current() after that flush, which is what a
+  dashboard rerun pays once per flush.
+
+Prints JSON; ``within_target`` compares flush + snapshot against the
+dashboard's 200 ms budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import LiveAnalytics, build_analytics  # noqa: E402
+from results_store import ResultsStore  # noqa: E402
+from synthetic import make_attempts  # noqa: E402  (benchmarks/ is on sys.path when run as a script)
+
+TARGET_MS = 200
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=50_000)
+    parser.add_argument("--attempts", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=200, help="attempts per measured flush")
+    parser.add_argument("--flushes", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultsStore(tmp, flush_rows=10 ** 9, flush_interval=None, compact_interval=None)
+        for student, subject, chapter, answers in make_attempts(args.students, args.attempts):
+            store.record_attempt(student, subject, chapter, "Medium", answers)
+        store.flush()
+        store.compact()
+
+        full = [_timed(lambda: build_analytics(store))[1] for _ in range(3)]
+        live, live_start = _timed(lambda: LiveAnalytics(store))
+        live.current()
+
+        extra = make_attempts(args.batch * args.flushes, 1, seed=1)
+        flushes, snapshots = [], []
+        for _ in range(args.flushes):
+            for _, (student, subject, chapter, answers) in zip(range(args.batch), extra):
+                store.record_attempt(student, subject, chapter, "Medium", answers)
+            flushes.append(_timed(store.flush)[1])
+            snapshots.append(_timed(live.current)[1])
+        rows = live.current().rows
+
+    per_flush = statistics.median(f + s for f, s in zip(flushes, snapshots))
+    json.dump({
+        "students": args.students,
+        "attempts_per_student": args.attempts,
+        "rows": rows,
+        "batch_attempts": args.batch,
+        "full_rebuild_ms": _ms(statistics.median(full)),
+        "live_start_ms": _ms(live_start),
+        "flush_median_ms": _ms(statistics.median(flushes)),
+        "snapshot_median_ms": _ms(statistics.median(snapshots)),
+        "per_flush_ms": _ms(per_flush),
+        "target_ms": TARGET_MS,
+        "within_target": per_flush * 1000 <= TARGET_MS,
+    }, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Per-interaction cost of fragment-scoped reruns versus full-script reruns.
+
+Usage:
+    python benchmarks/bench_fragments.py [--iterations 30]
+
+For each interaction (answering a quiz question, moving the feedback
+slider, picking a student on the teacher dashboard) the same widget change
+is replayed twice through Streamlit's AppTest harness: once as a full
+script rerun, which is what every interaction cost before these widgets
+moved into st.fragment functions, and once as the fragment-scoped rerun the
+browser now requests. Server CPU (process time, all threads) and wall time
+per interaction are reported as JSON.
+
+Two AppTest behaviours are adjusted to match the real server, and both
+lean on Streamlit internals that may need updating on upgrades: AppTest
+recompiles app.py on every run, whereas the server caches its bytecode, so
+one ScriptCache is shared across runs; and AppTest always reruns the whole
+script, so the fragment case requests the rerun the way the server does, by
+passing the fragment id in RerunData.
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1 import local_script_runner  # noqa: E402
+
+from syllabus import STATIC_QUESTIONS  # noqa: E402
+
+_RerunData = local_script_runner.RerunData
+_script_cache = ScriptCache()
+local_script_runner.ScriptCache = lambda: _script_cache
+
+
+@contextlib.contextmanager
+def fragment_scope(fragment_id):
+    """Make AppTest's next runs fragment-scoped reruns of ``fragment_id``."""
+    local_script_runner.RerunData = lambda **kw: _RerunData(fragment_id_queue=[fragment_id], is_fragment_scoped_rerun=True, **kw)
+    try:
+        yield
+    finally:
+        local_script_runner.RerunData = _RerunData
+
+
+def fragment_id(at, name):
+    for fid, wrapper in at._fragment_storage._fragments.items():
+        for cell in wrapper.__closure__ or ():
+            if getattr(cell.cell_contents, "__name__", None) == name:
+                return fid
+    raise LookupError(f"fragment {name!r} was not registered")
+
+
+def student_quiz():
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    at.session_state.logged_in = True
+    at.session_state.user_type = "student"
+    at.session_state.username = "student1"
+    at.session_state.current_page = "quiz_interface"
+    at.session_state.quiz_session = {"subject": "Engineering Physics", "chapter": "Wave Optics", "difficulty": "Medium",
+                                     "questions": STATIC_QUESTIONS["Default"][:5], "pending": None}
+    return at.run()
+
+
+def teacher_profiles():
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    at.session_state.logged_in = True
+    at.session_state.user_type = "teacher"
+    at.session_state.username = "teacher1"
+    at.session_state.teacher_page = "profiles"
+    return at.run()
+
+
+def answer_question(at, i):
+    radio = at.radio(key="q0")
+    radio.set_value(radio.options[i % len(radio.options)])
+
+
+def move_slider(at, i):
+    at.slider(key="quiz_feedback_rating").set_value(1 + i % 5)
+
+
+def pick_student(at, i):
+    box = [s for s in at.selectbox if s.label == "Select Student to View Profile"][0]
+    box.select_index(i % len(box.options))
+
+
+SCENARIOS = [
+    ("quiz_answer", student_quiz, answer_question, "quiz_questions"),
+    ("quiz_feedback_slider", student_quiz, move_slider, "quiz_feedback_form"),
+    ("dashboard_student_pick", teacher_profiles, pick_student, "student_analysis"),
+]
+
+
+def measure(at, interact, iterations):
+    cpu, wall = [], []
+    for i in range(iterations):
+        interact(at, i)
+        c0, w0 = time.process_time(), time.perf_counter()
+        at.run()
+        cpu.append((time.process_time() - c0) * 1000)
+        wall.append((time.perf_counter() - w0) * 1000)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    return {"cpu_ms": round(statistics.median(cpu), 2), "wall_ms": round(statistics.median(wall), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        for name, setup, interact, fragment in SCENARIOS:
+            at = setup()
+            full = measure(at, interact, args.iterations)
+            with fragment_scope(fragment_id(at, fragment)):
+                scoped = measure(at, interact, args.iterations)
+            results[name] = {
+                "full_rerun": full,
+                "fragment_rerun": scoped,
+                "cpu_reduction": round(1 - scoped["cpu_ms"] / full["cpu_ms"], 3) if full["cpu_ms"] else None,
+            }
+    json.dump({"iterations": args.iterations, "scenarios": results}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare whole-document prompts with chapter-scoped retrieval.
+
+Usage:
+    python benchmarks/bench_retrieval.py syllabus.pdf [--budget 3000] [--api-key KEY --model gemini-1.5-flash]
+
+For every chapter in SYLLABUS (or the --query values given) this reports the
+context tokens sent before and after retrieval and the time spent building
+and querying the index. With --api-key it also times a real Gemini call for
+both prompts; without it the benchmark runs fully offline.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retrieval import RetrievalIndex, estimate_tokens
+from syllabus import SYLLABUS
+
+
+def load_text(path):
+    if path.lower().endswith(".pdf"):
+        from pdf_extract import extract_text
+        with open(path, "rb") as f:
+            return extract_text(f.read())
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def timed_call(model, prompt):
+    if model is None:
+        return None
+    start = time.perf_counter()
+    model.generate_content(prompt)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("document", help="PDF or plain-text syllabus")
+    parser.add_argument("--budget", type=int, default=3000, help="context token budget")
+    parser.add_argument("--query", action="append", help="query to run instead of every SYLLABUS chapter")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"))
+    parser.add_argument("--model", default="gemini-1.5-flash")
+    args = parser.parse_args()
+
+    text = load_text(args.document)
+
+    start = time.perf_counter()
+    index = RetrievalIndex(text)
+    build_s = time.perf_counter() - start
+
+    model = None
+    if args.api_key:
+        import google.generativeai as genai
+        genai.configure(api_key=args.api_key)
+        model = genai.GenerativeModel(args.model)
+
+    queries = args.query or [f"{sub} {chap}" for sub, info in SYLLABUS.items() for chap in info["chapters"]]
+    full_tokens = estimate_tokens(text)
+    rows = []
+    for query in queries:
+        start = time.perf_counter()
+        excerpt = index.search(query, args.budget)
+        search_s = time.perf_counter() - start
+        rows.append({
+            "query": query,
+            "tokens_before": full_tokens,
+            "tokens_after": estimate_tokens(excerpt),
+            "search_ms": round(search_s * 1000, 3),
+            "call_s_before": timed_call(model, f"Context: {text}\n\nQuestion: Summarise {query}"),
+            "call_s_after": timed_call(model, f"Context: {excerpt}\n\nQuestion: Summarise {query}"),
+        })
+
+    after = [r["tokens_after"] for r in rows]
+    summary = {
+        "document": args.document,
+        "chunks": len(index),
+        "build_ms": round(build_s * 1000, 3),
+        "budget": args.budget,
+        "tokens_before": full_tokens,
+        "mean_tokens_after": round(sum(after) / len(after), 1) if after else 0,
+        "queries": rows,
+    }
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Measure bulk roster import/export throughput.
+
+Usage:
+    python benchmarks/bench_roster_io.py [--rows 100000] [--format csv|jsonl] [--batch-size 1000]
+
+Generates a synthetic roster (with a small share of duplicate and invalid
+rows), imports it into a fresh database in a temporary directory, exports
+it again and prints the timings as JSON.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from roster_io import CSV_FIELDS, export_roster, import_roster
+from storage import Storage
+from syllabus import SYLLABUS
+
+
+def synthetic_rows(n, seed=0):
+    rng = random.Random(seed)
+    subjects = list(SYLLABUS.keys())
+    for i in range(n):
+        row = {"role": "student", "username": f"stu{i:07d}", "password": "pass123",
+               "name": f"Student {i}", "roll_no": f"FE{i:07d}",
+               "subjects": rng.sample(subjects, 4), "attendance": rng.randint(50, 100)}
+        r = rng.random()
+        if r < 0.01:
+            row["username"] = f"stu{max(0, i - 1):07d}"        # duplicate
+        elif r < 0.02:
+            row["subjects"] = ["Astrology"]                     # invalid subject
+        yield row
+
+
+def write_roster(path, fmt, n):
+    with open(path, "w", newline="", encoding="utf-8") as fp:
+        if fmt == "csv":
+            writer = csv.DictWriter(fp, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for row in synthetic_rows(n):
+                writer.writerow({**row, "subjects": ";".join(row["subjects"])})
+        else:
+            for row in synthetic_rows(n):
+                fp.write(json.dumps(row) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, f"roster.{args.format}")
+        write_roster(src, args.format, args.rows)
+        storage = Storage(os.path.join(tmp, "bench.db"))
+
+        with open(src, "r", newline="", encoding="utf-8") as fp:
+            report = import_roster(storage, fp, args.format, args.batch_size)
+
+        start = time.perf_counter()
+        with open(os.path.join(tmp, f"export.{args.format}"), "w", newline="", encoding="utf-8") as fp:
+            exported = export_roster(storage, fp, args.format)
+        export_s = time.perf_counter() - start
+
+    json.dump({
+        "rows": args.rows,
+        "format": args.format,
+        "batch_size": args.batch_size,
+        "imported": report.imported,
+        "duplicates": len(report.duplicates),
+        "errors": len(report.errors),
+        "import_s": round(report.seconds, 3),
+        "import_rows_per_sec": round(report.rows_per_sec),
+        "exported": exported,
+        "export_s": round(export_s, 3),
+        "export_rows_per_sec": round(exported / export_s) if export_s else None,
+    }, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Cold-start benchmark for app.py.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--budget-ms 1500]
+
+Each run starts a fresh Python process (a cold worker), imports Streamlit,
+then renders the login page once through Streamlit's AppTest harness and
+once more as a warm rerun. Reported as JSON: median/max timings and which
+heavy libraries the login page pulled in. With --budget-ms the script exits
+non-zero when the median first render exceeds the budget or when any heavy
+library is loaded before it is needed, so it can gate CI after changes.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "plotly.express", "google.generativeai", "PyPDF2", "pyarrow"]
+
+CHILD = r"""
+import json, sys, time, warnings
+warnings.simplefilter("ignore")
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+preloaded = {m for m in sys.argv[2:] if m in sys.modules}   # pulled in by Streamlit itself
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+t2 = time.perf_counter()
+at.run()
+t3 = time.perf_counter()
+print(json.dumps({
+    "streamlit_import_ms": (t1 - t0) * 1000,
+    "first_render_ms": (t2 - t1) * 1000,
+    "warm_rerun_ms": (t3 - t2) * 1000,
+    "exception": [str(e.value) for e in at.exception],
+    "loaded": [m for m in sys.argv[2:] if m in sys.modules and m not in preloaded],
+}))
+"""
+
+
+def run_once(app_path, workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, app_path, *HEAVY_MODULES],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, help="fail if the median first render is slower than this")
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # The first run seeds the databases; it is reported but kept out of the medians
+        seed = run_once(args.app, workdir)
+        runs = [run_once(args.app, workdir) for _ in range(args.runs)]
+
+    def summary(key):
+        values = [r[key] for r in runs]
+        return {"median": round(statistics.median(values), 1), "max": round(max(values), 1)}
+
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    result = {
+        "runs": args.runs,
+        "streamlit_import_ms": summary("streamlit_import_ms"),
+        "first_render_ms": summary("first_render_ms"),
+        "warm_rerun_ms": summary("warm_rerun_ms"),
+        "seed_run_first_render_ms": round(seed["first_render_ms"], 1),
+        "heavy_modules_on_login": loaded,
+        "exceptions": sorted({e for r in runs for e in r["exception"]}),
+    }
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+    if args.budget_ms is not None:
+        over = result["first_render_ms"]["median"] > args.budget_ms
+        if over or loaded or result["exceptions"]:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""Headless end-to-end performance suite for app.py.
+
+Usage:
+    python benchmarks/bench_suite.py [--users 10,1000,100000] [--pdf-pages 10,100]
+        [--reruns 5] [--ai-runs 3] [--sessions 20] [--first-chunk 0.3]
+        [--chunk-interval 0.02] [--failure-rate 0.05] [--quota-rate 0.0] [--out results.json]
+
+Drives main() through Streamlit's AppTest harness with a local stand-in
+for google.generativeai (benchmarks/fake_genai.py), so the AI flows run
+through the real client, registry and scheduler with controlled latency
+and failure rates and no network. Synthetic syllabus PDFs and user datasets
+come from benchmarks/synthetic.py.
+
+Reported as JSON, once for the PDF pipeline and once per user scale (each
+scale runs in a fresh process against its own database):
+
+* ``pdf_extract``: extract_text throughput (MB/s, pages/s) per PDF size,
+  the first call (which starts the process pool) and a PdfTextCache hit.
+* ``save_data``: DataStore.put_many over every record (a bulk save) and
+  a single put_student.
+* ``pages``: first render and warm rerun (wall and CPU) of every page.
+* ``ai_flows``: Start Quiz, Ask PDF and lesson plan round trips, plus the
+  stand-in's call and failure counts.
+* ``memory``: the shared data store, and the Python heap each additional
+  logged-in session adds (tracemalloc).
+
+As in bench_fragments.py, one ScriptCache is shared across runs because
+the real server caches app.py's bytecode while AppTest recompiles it.
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fake_genai  # noqa: E402  (benchmarks/ is on sys.path when run as a script)
+from synthetic import make_attempts, make_pdf, make_users  # noqa: E402
+
+API_KEY = "bench-key"
+STUDENT_PAGES = ["student_dashboard", "assessment_setup", "quiz_interface", "student_ai"]
+TEACHER_PAGES = ["dashboard", "profiles", "feedback", "ai_tools"]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return {"median_ms": _ms(statistics.median(samples)), "p95_ms": _ms(samples[round(0.95 * (len(samples) - 1))]),
+            "max_ms": _ms(samples[-1])}
+
+
+# --- PDF PIPELINE (parent process) ---
+def bench_pdf(page_counts, repeats=3):
+    from pdf_cache import PdfTextCache
+    from pdf_extract import HAS_PDF, extract_text
+    if not HAS_PDF:
+        return {"skipped": "PyPDF2 not installed"}
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PdfTextCache(os.path.join(tmp, "pdf_cache"))
+        for pages in page_counts:
+            data = make_pdf(pages)
+            start = time.perf_counter()
+            text = extract_text(data)
+            first = time.perf_counter() - start
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                extract_text(data)
+                samples.append(time.perf_counter() - start)
+            cache.get_or_compute(data, extract_text)
+            start = time.perf_counter()
+            cache.get_or_compute(data, extract_text)
+            hit = time.perf_counter() - start
+            median = statistics.median(samples)
+            results.append({
+                "pages": pages, "pdf_bytes": len(data), "text_chars": len(text),
+                "first_ms": _ms(first), "median_ms": _ms(median),
+                "mb_per_s": round(len(data) / median / 1e6, 2), "pages_per_s": round(pages / median, 1),
+                "cached_ms": _ms(hit),
+            })
+    return results
+
+
+# --- ONE USER SCALE (worker process) ---
+def seed(users, attempts_per_user):
+    from results_store import RESULTS_DIR, ResultsStore
+    from storage import DB_FILE, Storage
+
+    start = time.perf_counter()
+    Storage(DB_FILE).insert_users(make_users(users))
+    users_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = ResultsStore(RESULTS_DIR, flush_rows=50_000)
+    for student, subject, chapter, answers in make_attempts(users, attempts_per_user):
+        results.record_attempt(student, subject, chapter, "Medium", answers)
+    results.close()
+    return {"users_s": round(users_s, 3), "results_s": round(time.perf_counter() - start, 3)}
+
+
+def bench_save_data(repeats=5):
+    from data_store import DataStore
+    from storage import DB_FILE, Storage
+
+    storage = Storage(DB_FILE)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = storage.load()
+    store = DataStore(storage, data)
+    store_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    students, teachers = dict(store.list_students()), dict(store.list_teachers())
+    start = time.perf_counter()
+    store.put_many(students, teachers)
+    put_many = time.perf_counter() - start
+
+    record = store.get_student("student1")
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        store.put_student("student1", dict(record))
+        samples.append(time.perf_counter() - start)
+    records = len(students) + len(teachers)
+    return {
+        "records": records, "put_many_s": round(put_many, 3), "per_record_us": round(put_many / records * 1e6, 2),
+        "put_student_ms": _ms(statistics.median(samples)),
+    }, store_bytes
+
+
+def new_session(user_type=None, username=None, **state):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=180)
+    at.session_state.api_key = API_KEY
+    if user_type:
+        at.session_state.logged_in = True
+        at.session_state.user_type = user_type
+        at.session_state.username = username
+    for key, value in state.items():
+        at.session_state[key] = value
+    return at
+
+
+def run(at):
+    c0, w0 = time.process_time(), time.perf_counter()
+    at.run()
+    cpu, wall = time.process_time() - c0, time.perf_counter() - w0
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return wall, cpu
+
+
+def page_sessions():
+    from syllabus import STATIC_QUESTIONS
+    quiz = {"subject": "Engineering Physics", "chapter": "Wave Optics", "difficulty": "Medium",
+            "questions": STATIC_QUESTIONS["Default"][:5], "pending": None}
+    yield "login", new_session()
+    for page in STUDENT_PAGES:
+        state = {"quiz_session": dict(quiz, questions=list(quiz["questions"]))} if page == "quiz_interface" else {}
+        yield page, new_session("student", "student1", current_page=page, **state)
+    for page in TEACHER_PAGES:
+        yield f"teacher_{page}", new_session("teacher", "teacher1", teacher_page=page)
+
+
+def bench_pages(reruns):
+    pages = {}
+    for name, at in page_sessions():
+        first_wall, first_cpu = run(at)
+        walls, cpus = zip(*(run(at) for _ in range(reruns)))
+        pages[name] = {"first_ms": _ms(first_wall), "first_cpu_ms": _ms(first_cpu),
+                       "rerun": _summary(walls), "rerun_cpu_ms": _ms(statistics.median(cpus))}
+    return pages
+
+
+def _widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def bench_ai_flows(runs, pdf_pages, backend):
+    from syllabus import SYLLABUS
+    # Distinct wordings too: numbered variants of one question would be near-matches in the answer cache
+    topics = [c for info in SYLLABUS.values() for c in info["chapters"]]
+    flows = {"start_quiz": [], "ask_pdf": [], "lesson_plan": []}
+    questions = []
+    for i in range(runs):
+        # A new document each time, so neither the question bank nor the answer cache can serve it
+        pdf = ("syllabus.pdf", make_pdf(pdf_pages, seed=1000 + i), "application/pdf")
+
+        at = new_session("student", "student1", current_page="assessment_setup")
+        run(at)
+        at.file_uploader(key="syllabus_upload_assessment").set_value(pdf)
+        _widget(at.button, "Start Quiz").click()
+        flows["start_quiz"].append(run(at)[0])
+        questions.append(len(at.session_state.quiz_session["questions"]))
+
+        at = new_session("student", "student1", current_page="student_ai")
+        run(at)
+        at.file_uploader(key="chat_pdf").set_value(pdf)
+        _widget(at.text_input, "Question").set_value(f"Explain {topics[-1 - i % len(topics)]}")
+        _widget(at.button, "Ask").click()
+        flows["ask_pdf"].append(run(at)[0])
+
+        at = new_session("teacher", "teacher1", teacher_page="ai_tools")
+        run(at)
+        _widget(at.text_input, "Enter Topic for Lesson Plan").set_value(topics[i % len(topics)])
+        _widget(at.button, "Generate Plan").click()
+        flows["lesson_plan"].append(run(at)[0])
+
+    result = {name: _summary(samples) for name, samples in flows.items()}
+    result["quiz_questions"] = questions
+    result["gemini"] = backend.stats()
+    return result
+
+
+def bench_memory(users, sessions):
+    # One warm session first, so shared caches are not charged to the sessions measured
+    keep = [new_session("student", "student1", current_page="student_dashboard")]
+    run(keep[0])
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(sessions):
+        at = new_session("student", f"student{i % users + 1}", current_page="student_dashboard")
+        run(at)
+        keep.append(at)
+    gc.collect()
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / sessions
+    tracemalloc.stop()
+    return per_session
+
+
+def worker(args):
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+
+    result = {"users": args.worker}
+    result["seed"] = seed(args.worker, args.attempts_per_user)
+    result["save_data"], store_bytes = bench_save_data()
+    result["pages"] = bench_pages(args.reruns)
+    result["ai_flows"] = bench_ai_flows(args.ai_runs, min(args.pdf_pages), args.backend)
+    result["memory"] = {"store_mb": round(store_bytes / 2**20, 2),
+                        "per_session_kb": round(bench_memory(args.worker, args.sessions) / 1024, 1),
+                        "sessions": args.sessions}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="10,1000,100000", help="comma-separated dataset sizes")
+    parser.add_argument("--attempts-per-user", type=int, default=1, help="seeded quiz attempts per student")
+    parser.add_argument("--pdf-pages", default="10,100", help="comma-separated synthetic PDF sizes")
+    parser.add_argument("--reruns", type=int, default=5, help="warm reruns per page")
+    parser.add_argument("--ai-runs", type=int, default=3, help="round trips per AI flow")
+    parser.add_argument("--sessions", type=int, default=20, help="sessions opened for the memory measurement")
+    parser.add_argument("--first-chunk", type=float, default=0.3, help="fake Gemini seconds to first chunk")
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="fake Gemini seconds between chunks")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="share of fake Gemini calls that fail")
+    parser.add_argument("--quota-rate", type=float, default=0.0, help="share of fake Gemini calls over quota")
+    parser.add_argument("--out", help="write the JSON here instead of stdout")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.pdf_pages = [int(p) for p in args.pdf_pages.split(",")]
+    warnings.simplefilter("ignore")
+
+    if args.worker is not None:
+        args.backend = fake_genai.install(first_chunk=args.first_chunk, chunk_interval=args.chunk_interval,
+                                          failure_rate=args.failure_rate, quota_rate=args.quota_rate)
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            result = worker(args)
+        print(json.dumps(result))
+        sys.stdout.flush()
+        os._exit(0)   # skip joining the app's background threads and process pool
+
+    report = {"config": {k: v for k, v in vars(args).items() if k not in ("out", "worker")},
+              "pdf_extract": bench_pdf(args.pdf_pages), "scales": {}}
+    for users in (int(u) for u in args.users.split(",")):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--worker", str(users)],
+                             capture_output=True, text=True)
+        if out.returncode:
+            report["scales"][str(users)] = {"error": out.stderr.strip().splitlines()[-1:]}
+            continue
+        report["scales"][str(users)] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    if args.out:
+        with open(args.out, "w") as fp:
+            json.dump(report, fp, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
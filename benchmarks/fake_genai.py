@@ -0,0 +1,137 @@
+"""Local stand-in for ``google.generativeai`` used by the benchmarks.
+
+``install()`` registers a fake module under ``google.generativeai`` in
+``sys.modules`` before the app is imported, so LLMClient, the model
+registry and the scheduler run unchanged while no request leaves the
+machine. Responses arrive after a configurable time to first chunk, stream
+in chunks at a configurable interval, and a configurable share of calls
+fails with the same exceptions the real SDK raises (falling back to
+ConnectionError when google.api_core is not installed). Question prompts
+get a JSON array of distinct MCQs; anything else gets filler text.
+"""
+import importlib.machinery
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+import types
+
+MODELS = {"models/gemini-fake-flash": 1.0, "models/gemini-fake-pro": 2.0}   # name -> latency multiplier
+WORDS = ("wave interference diffraction polarization laser fibre quantum tunnelling semiconductor junction "
+         "entropy enthalpy viscosity stress strain torque momentum impedance resonance matrix eigenvalue").split()
+
+
+class FakeGemini:
+    def __init__(self, first_chunk=0.3, chunk_interval=0.02, failure_rate=0.0, quota_rate=0.0,
+                 answer_words=150, chunk_words=8, seed=0):
+        self.first_chunk = first_chunk
+        self.chunk_interval = chunk_interval
+        self.failure_rate = failure_rate
+        self.quota_rate = quota_rate
+        self.answer_words = answer_words
+        self.chunk_words = chunk_words
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self.calls = 0
+        self.failures = 0
+        self.quota_errors = 0
+
+    def _roll(self):
+        with self._lock:
+            self.calls += 1
+            return self._rng.random(), self._rng.uniform(0.5, 1.5)
+
+    def _fail(self, kind):
+        try:
+            from google.api_core import exceptions
+        except ImportError:
+            raise ConnectionError(f"fake {kind}")
+        if kind == "quota":
+            raise exceptions.ResourceExhausted("fake quota exhausted")
+        raise exceptions.ServiceUnavailable("fake outage")
+
+    def _text(self, prompt, generation_config):
+        if generation_config or "multiple-choice" in prompt:
+            match = re.search(r"Generate (\d+)", prompt)
+            count = int(match.group(1)) if match else 5
+            questions = []
+            for _ in range(count):
+                n = next(self._ids)
+                opts = [f"Option {c} {n}" for c in "ABCD"]
+                questions.append({"q": f"Synthetic question {n} on {WORDS[n % len(WORDS)]}?", "opts": opts, "ans": opts[n % 4]})
+            return json.dumps(questions)
+        return " ".join(WORDS[(i * 7) % len(WORDS)] for i in range(self.answer_words)) + "."
+
+    def respond(self, model_name, prompt, stream, generation_config):
+        roll, jitter = self._roll()
+        time.sleep(self.first_chunk * MODELS.get(model_name, 1.0) * jitter)
+        if roll < self.quota_rate:
+            with self._lock:
+                self.quota_errors += 1
+            self._fail("quota")
+        if roll < self.quota_rate + self.failure_rate:
+            with self._lock:
+                self.failures += 1
+            self._fail("outage")
+        text = self._text(prompt, generation_config)
+        if not stream:
+            return _Chunk(text)
+        words = text.split(" ")
+        return _Stream([" ".join(words[i:i + self.chunk_words]) + " " for i in range(0, len(words), self.chunk_words)],
+                       self.chunk_interval)
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "failures": self.failures, "quota_errors": self.quota_errors}
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Stream:
+    def __init__(self, parts, interval):
+        self._parts = parts
+        self._interval = interval
+
+    def __iter__(self):
+        for i, part in enumerate(self._parts):
+            if i:
+                time.sleep(self._interval)
+            yield _Chunk(part)
+
+
+class _Model:
+    def __init__(self, name, backend):
+        self.model_name = name if name.startswith("models/") else f"models/{name}"
+        self._backend = backend
+
+    def generate_content(self, prompt, stream=False, request_options=None, generation_config=None, **kwargs):
+        return self._backend.respond(self.model_name, prompt, stream, generation_config)
+
+
+def install(**options):
+    """Register the fake SDK in ``sys.modules`` and return its FakeGemini backend."""
+    backend = FakeGemini(**options)
+    genai = types.ModuleType("google.generativeai")
+    genai.__spec__ = importlib.machinery.ModuleSpec("google.generativeai", None)
+    genai.configure = lambda api_key=None, **kwargs: None
+    genai.GenerativeModel = lambda model_name, **kwargs: _Model(model_name, backend)
+    genai.list_models = lambda: [types.SimpleNamespace(name=name, supported_generation_methods=["generateContent"])
+                                 for name in MODELS]
+    genai.backend = backend
+    if "google" not in sys.modules:
+        try:
+            import google  # noqa: F401  (namespace package that also holds google.api_core)
+        except ImportError:
+            google = types.ModuleType("google")
+            google.__path__ = []
+            sys.modules["google"] = google
+    sys.modules["google"].generativeai = genai
+    sys.modules["google.generativeai"] = genai
+    return backend
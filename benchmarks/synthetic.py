@@ -0,0 +1,80 @@
+"""Synthetic syllabus PDFs and user datasets for the benchmarks."""
+import random
+
+from syllabus import SYLLABUS
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def syllabus_lines(n, seed=0):
+    """Plausible syllabus text: chapter headings from SYLLABUS followed by topic lines."""
+    rng = random.Random(seed)
+    chapters = [(s, c) for s, info in SYLLABUS.items() for c in info["chapters"]]
+    words = " ".join(f"{s} {c}" for s, c in chapters).lower().split()
+    lines = []
+    while len(lines) < n:
+        subject, chapter = rng.choice(chapters)
+        lines.append(f"Unit {len(lines) // 12 + 1}: {subject} - {chapter}")
+        lines.extend(" ".join(rng.choices(words, k=12)).capitalize() + "." for _ in range(11))
+    return lines[:n]
+
+
+def make_pdf(pages, lines_per_page=45, seed=0):
+    """A text PDF with ``pages`` pages that PyPDF2 can extract, built without any PDF library."""
+    lines = syllabus_lines(pages * lines_per_page, seed)
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for p in range(pages):
+        body = "\n".join(f"({_pdf_escape(line)}) Tj T*" for line in lines[p * lines_per_page:(p + 1) * lines_per_page])
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td\n{body}\nET"
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def make_users(students, teachers=None, seed=0):
+    """``(role, username, record)`` rows shaped like the app's own records.
+
+    Usernames follow the demo accounts (student1.., teacher1..) so the
+    pages can be driven as a known user at any dataset size.
+    """
+    rng = random.Random(seed)
+    subjects = list(SYLLABUS.keys())
+    teachers = teachers if teachers is not None else max(1, students // 50)
+    for i in range(1, students + 1):
+        enrolled = rng.sample(subjects, 4)
+        yield "student", f"student{i}", {
+            "password": "pass123", "name": f"Student {i}", "roll_no": f"FE{i:06d}", "subjects": enrolled,
+            "marks": {s: rng.randint(20, 100) for s in enrolled if rng.random() < 0.7},
+            "attendance": rng.randint(50, 100), "has_data": True,
+        }
+    for i in range(1, teachers + 1):
+        yield "teacher", f"teacher{i}", {
+            "password": "teach123", "name": f"Prof. Teacher {i}", "subject": subjects[(i - 1) % len(subjects)],
+            "feedback_score": round(rng.uniform(3, 5), 2),
+        }
+
+
+def make_attempts(students, per_student=1, seed=0):
+    """``(student, subject, chapter, answers)`` quiz attempts for seeding the results store."""
+    rng = random.Random(seed)
+    chapters = [(s, c) for s, info in SYLLABUS.items() for c in info["chapters"]]
+    for i in range(1, students + 1):
+        for _ in range(per_student):
+            subject, chapter = rng.choice(chapters)
+            yield f"student{i}", subject, chapter, [(f"{subject}/{chapter}/{q}", "A", rng.random() < 0.6) for q in range(5)]
@@ -0,0 +1,151 @@
+import threading
+import time
+from types import MappingProxyType
+
+from tracing import Tracer
+
+
+# --- SHARED IN-PROCESS DATA STORE ---
+# One copy of the user records per server process instead of one per
+# browser session. Records are treated as immutable: a write persists the
+# new record first and then swaps it into the dict, so readers never see a
+# half-updated record and need no lock. Writers lock only the stripe that
+# owns the username, and every write bumps ``version`` so derived caches
+# know when to rebuild. ``roster_version`` moves only when a student is
+# added or changes a field the roster index reads, so marks and feedback
+# writes don't rebuild the roster. Each write is traced as a
+# ``store.<method>`` span when tracing is on.
+
+LOCK_STRIPES = 64
+SYNC_INTERVAL = 5.0   # seconds between checks for out-of-band bulk writes
+ROSTER_FIELDS = ("name", "subjects", "attendance")   # what RosterIndex reads from a student record
+
+
+def _roster_changed(old, new):
+    return old is None or any(old.get(f) != new.get(f) for f in ROSTER_FIELDS)
+
+
+class DataStore:
+    def __init__(self, storage, data, tracer=None):
+        self.storage = storage
+        self.tracer = tracer or Tracer()
+        self._students = dict(data["students"])
+        self._teachers = dict(data["teachers"])
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._version_lock = threading.Lock()
+        self.version = 0
+        self.roster_version = 0
+
+        self._generation = storage.generation()
+        self._last_sync = time.monotonic()
+        self._sync_lock = threading.Lock()
+
+        # Live, read-only views for sessions to read through
+        self.students = MappingProxyType(self._students)
+        self.teachers = MappingProxyType(self._teachers)
+
+    def _lock_for(self, username):
+        return self._stripes[hash(username) % LOCK_STRIPES]
+
+    def _bump(self, roster=False):
+        with self._version_lock:
+            self.version += 1
+            if roster:
+                self.roster_version += 1
+            return self.version
+
+    def sync(self):
+        """Pick up bulk writes made by other processes (e.g. a CLI roster import).
+
+        Cheap to call on every rerun: it queries the storage generation at
+        most once per SYNC_INTERVAL and reloads only when it has changed.
+        """
+        now = time.monotonic()
+        if now - self._last_sync < SYNC_INTERVAL or not self._sync_lock.acquire(blocking=False):
+            return False
+        try:
+            self._last_sync = now
+            generation = self.storage.generation()
+            if generation == self._generation:
+                return False
+            data = self.storage.load()
+            self._students.update(data["students"])
+            self._teachers.update(data["teachers"])
+            self._generation = generation
+        finally:
+            self._sync_lock.release()
+        self._bump(roster=True)
+        return True
+
+    # --- reads ---
+    def get_student(self, username):
+        return self._students.get(username)
+
+    def get_teacher(self, username):
+        return self._teachers.get(username)
+
+    def list_students(self):
+        # list() over a dict runs without releasing the GIL, so this is a consistent snapshot
+        return list(self._students.items())
+
+    def list_teachers(self):
+        return list(self._teachers.items())
+
+    # --- writes ---
+    def add_user(self, role, username, record):
+        """Create a student or teacher. Returns False if the username is taken."""
+        target = self._students if role == "student" else self._teachers
+        with self.tracer.span("store.add_user", role=role), self._lock_for(username):
+            if username in target or not self.storage.insert_user(role, username, record):
+                return False
+            target[username] = record
+        self._bump(roster=role == "student")
+        return True
+
+    def put_student(self, username, record):
+        with self.tracer.span("store.put_student"), self._lock_for(username):
+            self.storage.upsert_student(username, record)
+            old = self._students.get(username)
+            self._students[username] = record
+        self._bump(roster=_roster_changed(old, record))
+
+    def put_teacher(self, username, record):
+        with self.tracer.span("store.put_teacher"), self._lock_for(username):
+            self.storage.upsert_teacher(username, record)
+            self._teachers[username] = record
+        self._bump()
+
+    def update_student(self, username, update):
+        """Apply ``update(record)`` to a copy of the student's record and store it."""
+        with self.tracer.span("store.update_student"), self._lock_for(username):
+            current = self._students.get(username)
+            if current is None:
+                return None
+            record = dict(current)
+            update(record)
+            self.storage.upsert_student(username, record)
+            self._students[username] = record
+        self._bump(roster=_roster_changed(current, record))
+        return record
+
+    def update_teacher(self, username, update):
+        with self.tracer.span("store.update_teacher"), self._lock_for(username):
+            record = self.storage.update_teacher(username, update)
+            if record is None:
+                return None
+            self._teachers[username] = record
+        self._bump()
+        return record
+
+    def put_many(self, students=None, teachers=None):
+        with self.tracer.span("store.put_many", records=len(students or ()) + len(teachers or ())):
+            self.storage.upsert_many(students, teachers)
+            roster = False
+            for username, record in (students or {}).items():
+                with self._lock_for(username):
+                    roster = _roster_changed(self._students.get(username), record) or roster
+                    self._students[username] = record
+            for username, record in (teachers or {}).items():
+                with self._lock_for(username):
+                    self._teachers[username] = record
+        self._bump(roster=roster)
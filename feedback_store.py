@@ -0,0 +1,111 @@
+import time
+
+
+# --- FEEDBACK STORE ---
+# Quiz feedback lives in its own table in the user database, indexed by
+# teacher, subject and insertion order. Each write also bumps running
+# aggregates (count, rating sum, 1-5 histogram) per (teacher, subject) plus
+# an ALL_SUBJECTS row per teacher, so dashboards never rescan the comments.
+
+ALL_SUBJECTS = "*"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    teacher TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    student TEXT,
+    rating INTEGER NOT NULL,
+    comment TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_teacher ON feedback (teacher, id);
+CREATE INDEX IF NOT EXISTS idx_feedback_teacher_subject ON feedback (teacher, subject, id);
+CREATE INDEX IF NOT EXISTS idx_feedback_subject_time ON feedback (subject, created_at);
+CREATE TABLE IF NOT EXISTS feedback_stats (
+    teacher TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    r1 INTEGER NOT NULL DEFAULT 0,
+    r2 INTEGER NOT NULL DEFAULT 0,
+    r3 INTEGER NOT NULL DEFAULT 0,
+    r4 INTEGER NOT NULL DEFAULT 0,
+    r5 INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (teacher, subject)
+);
+"""
+
+
+class FeedbackStore:
+    def __init__(self, storage):
+        self.storage = storage
+        with storage.transaction() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _insert(self, conn, teacher, subject, rating, comment, student, created_at):
+        rating = min(5, max(1, int(rating)))
+        cur = conn.execute(
+            "INSERT INTO feedback (teacher, subject, student, rating, comment, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (teacher, subject, student, rating, comment, created_at),
+        )
+        bucket = f"r{rating}"
+        for key in (subject, ALL_SUBJECTS):
+            conn.execute(
+                f"INSERT INTO feedback_stats (teacher, subject, count, rating_sum, {bucket}) VALUES (?, ?, 1, ?, 1) "
+                f"ON CONFLICT (teacher, subject) DO UPDATE SET count = count + 1, rating_sum = rating_sum + excluded.rating_sum, {bucket} = {bucket} + 1",
+                (teacher, key, rating),
+            )
+        return cur.lastrowid
+
+    def add(self, teachers, subject, rating, comment, student=None):
+        """Record one submission for each teacher in ``teachers``. Returns the new ids."""
+        now = time.time()
+        with self.storage.transaction() as conn:
+            return [self._insert(conn, t, subject, rating, comment, student, now) for t in teachers]
+
+    def import_comments(self, teacher, comments):
+        # Legacy feedback_comments lists carry no timestamps; ids keep their order
+        with self.storage.transaction() as conn:
+            for c in comments:
+                self._insert(conn, teacher, c.get("subject", "General"), c.get("rating", 5), c.get("comment"), None, 0.0)
+
+    def latest(self, teacher, limit=5, before_id=None, subject=None):
+        """Keyset-paginated newest-first page. Returns ``(rows, next_cursor)``.
+
+        Pass ``next_cursor`` back as ``before_id`` for the following page;
+        it is ``None`` when there are no older entries.
+        """
+        where = ["teacher = ?"]
+        params = [teacher]
+        if subject is not None:
+            where.append("subject = ?")
+            params.append(subject)
+        if before_id is not None:
+            where.append("id < ?")
+            params.append(before_id)
+        rows = self.storage.query(
+            f"SELECT id, subject, student, rating, comment, created_at FROM feedback WHERE {' AND '.join(where)} ORDER BY id DESC LIMIT ?",
+            (*params, limit + 1),
+        )
+        page = [
+            {"id": r[0], "subject": r[1], "student": r[2], "rating": r[3], "comment": r[4], "created_at": r[5]}
+            for r in rows[:limit]
+        ]
+        next_cursor = page[-1]["id"] if len(rows) > limit else None
+        return page, next_cursor
+
+    def stats(self, teacher):
+        """Aggregates for ``teacher``: overall totals plus one entry per subject."""
+        rows = self.storage.query(
+            "SELECT subject, count, rating_sum, r1, r2, r3, r4, r5 FROM feedback_stats WHERE teacher = ?",
+            (teacher,),
+        )
+        result = {"count": 0, "mean": 0.0, "histogram": [0] * 5, "subjects": {}}
+        for subject, count, rating_sum, *hist in rows:
+            entry = {"count": count, "mean": rating_sum / count if count else 0.0, "histogram": hist}
+            if subject == ALL_SUBJECTS:
+                result.update(entry)
+            else:
+                result["subjects"][subject] = entry
+        return result
@@ -0,0 +1,377 @@
+import asyncio
+import contextvars
+import functools
+import importlib.util
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from llm_scheduler import LLMScheduler, Overloaded
+from model_registry import ModelRegistry
+from tracing import Tracer
+
+# google.generativeai takes most of a second to import, so it is only
+# loaded when the first model is built
+try:
+    HAS_AI = importlib.util.find_spec("google.generativeai") is not None
+except ModuleNotFoundError:
+    # find_spec imports the parent package, which raises if "google" is missing
+    HAS_AI = False
+
+
+def _genai():
+    import google.generativeai as genai
+    return genai
+
+
+@functools.lru_cache(maxsize=None)
+def retryable_errors():
+    errors = (TimeoutError, ConnectionError)
+    try:
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:
+        return errors
+    return errors + (
+        api_exceptions.ResourceExhausted,
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.DeadlineExceeded,
+        api_exceptions.InternalServerError,
+        api_exceptions.TooManyRequests,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def quota_errors():
+    try:
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:
+        return ()
+    return (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests)
+
+
+# --- SHARED GEMINI CLIENT ---
+# genai.configure() is process-global, so building a model for one key and
+# then configuring another would silently switch keys under it. Models are
+# therefore built under a lock and pinned to the client created for their
+# key, then cached per (api_key, model_name) and reused by every session.
+# Every call goes through the model registry: the requested model is used
+# while it is healthy, otherwise the call is routed to the fastest healthy
+# one. ``model_name=None`` always routes. Each attempt also holds a slot
+# from the process-wide LLMScheduler for as long as the request runs, and
+# is traced as an ``llm.generate`` / ``llm.stream`` span when tracing is on.
+# Pooled calls (submit, batches) are queued with the scheduler on the
+# caller's thread and take a pool thread only once their slot is granted.
+
+_configure_lock = threading.Lock()
+
+
+class LLMClient:
+    def __init__(self, max_workers=32, timeout=60, retries=3, backoff=0.5, max_backoff=8.0, models_ttl=600.0,
+                 max_concurrent=8, max_queue=100, max_wait=90.0, tracer=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._models = {}
+        self._models_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self.registry = ModelRegistry(self._text_models, ttl=models_ttl)
+        # Work reaches the pool only once the scheduler grants it a slot, so the
+        # pool only has to cover the concurrency cap plus retries waiting for a slot again
+        self.scheduler = LLMScheduler(max_concurrent, max_queue, max_wait,
+                                      is_quota_error=lambda e: isinstance(e, quota_errors()))
+        self.tracer = tracer or Tracer()
+
+    def model(self, api_key, model_name):
+        key = (api_key, model_name)
+        with self._models_lock:
+            model = self._models.get(key)
+        if model is not None:
+            return model
+
+        genai = _genai()
+        with _configure_lock:
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(model_name)
+            if hasattr(model, "_client"):
+                from google.generativeai import client as genai_client
+                model._client = genai_client.get_default_generative_client()
+
+        with self._models_lock:
+            return self._models.setdefault(key, model)
+
+    def list_models(self, api_key):
+        genai = _genai()
+        with _configure_lock:
+            genai.configure(api_key=api_key)
+            return list(genai.list_models())
+
+    def _text_models(self, api_key):
+        return [m.name for m in self.list_models(api_key)
+                if 'generateContent' in m.supported_generation_methods and 'gemini' in m.name]
+
+    def available_models(self, api_key):
+        """Gemini models usable with ``api_key``; refreshed in the background once stale."""
+        return self.registry.models(api_key)
+
+    def _route(self, api_key, model_name, failed):
+        name = self.registry.pick(api_key, model_name, avoid=failed)
+        if name is None:
+            raise ValueError("No Gemini model is available for this API key")
+        return name
+
+    def _record_failure(self, api_key, name, start, error):
+        self.registry.record(api_key, name, time.monotonic() - start, ok=False, quota=isinstance(error, quota_errors()))
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter: spreads retries from many sessions instead of synchronising them
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt))))
+
+    def generate(self, api_key, model_name, prompt, timeout=None, ticket=None, **kwargs):
+        """Return the response text for ``prompt``, retrying transient failures.
+
+        A failed attempt is retried on another healthy model when there is
+        one, and on the same model after a backoff when there is not.
+        ``ticket`` is a slot already granted by the scheduler, used for the
+        first attempt.
+        """
+        request_options = {"timeout": timeout or self.timeout}
+        failed = set()
+        for attempt in range(self.retries + 1):
+            try:
+                name = self._route(api_key, model_name, failed)
+            except Exception:
+                _release_unused(self.scheduler, ticket)
+                raise
+            if name in failed:
+                self._sleep_before_retry(attempt - 1)
+            try:
+                with self.tracer.span("llm.generate", model=name, attempt=attempt, prompt_chars=len(prompt)) as span, \
+                        self.scheduler.slot(ticket) as slot:
+                    ticket = None
+                    start = time.monotonic()
+                    span.set(queue_ms=(start - slot.enqueued) * 1000)
+                    text = self.model(api_key, name).generate_content(prompt, request_options=request_options, **kwargs).text
+                    if span: span.set(response_bytes=len(text.encode("utf-8")))
+            except retryable_errors() as e:
+                self._record_failure(api_key, name, start, e)
+                if attempt == self.retries:
+                    raise
+                failed.add(name)
+                continue
+            self.registry.record(api_key, name, time.monotonic() - start)
+            return text
+
+    def stream(self, api_key, model_name, prompt, cancel=None, timeout=None, ticket=None, **kwargs):
+        """Yield response text chunks as they arrive.
+
+        Transient failures are retried (or routed to another model) only
+        until the first chunk has been yielded; the registry records the
+        time to that first chunk. Setting the ``cancel`` event (or closing
+        the generator) stops reading and cancels the underlying streaming
+        call. ``ticket`` is as for :meth:`generate`.
+        """
+        request_options = {"timeout": timeout or self.timeout}
+        failed = set()
+        for attempt in range(self.retries + 1):
+            if cancel is not None and cancel.is_set():
+                _release_unused(self.scheduler, ticket)
+                return
+            try:
+                name = self._route(api_key, model_name, failed)
+            except Exception:
+                _release_unused(self.scheduler, ticket)
+                raise
+            if name in failed:
+                self._sleep_before_retry(attempt - 1)
+            response = None
+            started = False
+            try:
+                with self.tracer.span("llm.stream", model=name, attempt=attempt, prompt_chars=len(prompt)) as span, \
+                        self.scheduler.slot(ticket) as slot:
+                    ticket = None
+                    start = time.monotonic()
+                    span.set(queue_ms=(start - slot.enqueued) * 1000)
+                    response = self.model(api_key, name).generate_content(
+                        prompt, stream=True, request_options=request_options, **kwargs)
+                    for chunk in response:
+                        if cancel is not None and cancel.is_set():
+                            return
+                        text = chunk.text
+                        if text:
+                            if not started:
+                                started = True
+                                self.registry.record(api_key, name, time.monotonic() - start)
+                                span.set(first_chunk_ms=(time.monotonic() - start) * 1000)
+                            if span: span.add(response_bytes=len(text.encode("utf-8")))
+                            yield text
+                return
+            except retryable_errors() as e:
+                self._record_failure(api_key, name, start, e)
+                if started or attempt == self.retries:
+                    raise
+                failed.add(name)
+            finally:
+                _cancel_response(response)
+
+    def _submit(self, fn, on_error):
+        """Queue ``fn(ticket)`` with the scheduler for the current caller and run it on the pool once granted.
+
+        If the call is shed, now or after waiting, ``on_error`` gets the
+        Overloaded instead. Returns the ticket, or None if it was shed at once.
+        """
+        # Pool threads inherit the caller's context, so retries and traces stay attributed to the right user
+        context = contextvars.copy_context()
+
+        def on_ready(ticket, error):
+            if error is not None:
+                on_error(error)
+                return
+            try:
+                self._executor.submit(context.run, fn, ticket)
+            except RuntimeError as e:
+                # The pool has shut down (interpreter exit)
+                self.scheduler.release(ticket, ok=False)
+                on_error(e)
+
+        try:
+            return self.scheduler.submit(on_ready)
+        except Overloaded as e:
+            on_error(e)
+            return None
+
+    def _wait(self, future):
+        # Sheds queued calls that waited too long and reports queue position while blocked
+        while not wait([future], timeout=self.scheduler.poll_interval).done:
+            self.scheduler.expire()
+            self.scheduler.notify_waiting()
+
+    def submit(self, api_key, model_name, prompt, **kwargs):
+        """Queue :meth:`generate` for the current caller; returns a Future for the text."""
+        future = Future()
+
+        def run(ticket):
+            if not future.set_running_or_notify_cancel():
+                self.scheduler.release(ticket, ok=False)
+                return
+            try:
+                future.set_result(self.generate(api_key, model_name, prompt, ticket=ticket, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+        def fail(error):
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+        self._submit(run, fail)
+        return future
+
+    def generate_batch(self, api_key, model_name, prompts, **kwargs):
+        """Run ``prompts`` concurrently. Each slot holds the text or the exception it raised."""
+        futures = [self.submit(api_key, model_name, p, **kwargs) for p in prompts]
+        results = []
+        for f in futures:
+            self._wait(f)
+            try:
+                results.append(f.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def stream_batch(self, api_key, model_name, prompts, **kwargs):
+        """Stream ``prompts`` concurrently, yielding ``(index, text)`` chunks from whichever arrives first.
+
+        A prompt that fails or is shed yields ``(index, exception)`` once.
+        Closing the generator early cancels the streams still running and
+        withdraws the ones still queued.
+        """
+        chunks = queue.Queue()
+        cancel = threading.Event()
+        finished = object()
+
+        def run(i, prompt, ticket):
+            try:
+                for text in self.stream(api_key, model_name, prompt, cancel=cancel, ticket=ticket, **kwargs):
+                    chunks.put((i, text))
+            except Exception as e:
+                chunks.put((i, e))
+            finally:
+                chunks.put((i, finished))
+
+        def failed(i):
+            def put(error):
+                chunks.put((i, error))
+                chunks.put((i, finished))
+            return put
+
+        tickets = [self._submit(functools.partial(run, i, prompt), failed(i)) for i, prompt in enumerate(prompts)]
+        remaining = len(prompts)
+        try:
+            while remaining:
+                try:
+                    i, item = chunks.get(timeout=self.scheduler.poll_interval)
+                except queue.Empty:
+                    self.scheduler.expire()
+                    self.scheduler.notify_waiting()
+                    continue
+                if item is finished:
+                    remaining -= 1
+                else:
+                    yield i, item
+        finally:
+            cancel.set()
+            for ticket in tickets:
+                if ticket is not None:
+                    self.scheduler.cancel(ticket)
+
+    async def agenerate(self, api_key, model_name, prompt, **kwargs):
+        return await asyncio.wrap_future(self.submit(api_key, model_name, prompt, **kwargs))
+
+    async def agenerate_batch(self, api_key, model_name, prompts, **kwargs):
+        return await asyncio.gather(
+            *(self.agenerate(api_key, model_name, p, **kwargs) for p in prompts),
+            return_exceptions=True,
+        )
+
+    def bind(self, api_key, model_name):
+        return BoundModel(self, api_key, model_name)
+
+
+def _release_unused(scheduler, ticket):
+    # A granted ticket that never reached scheduler.slot() still holds its slot
+    if ticket is not None:
+        scheduler.release(ticket, ok=False)
+
+
+def _cancel_response(response):
+    # The SDK has no public close(); the wrapped gRPC stream does expose cancel()
+    call = getattr(response, "_iterator", None)
+    cancel = getattr(call, "cancel", None)
+    if callable(cancel):
+        try:
+            cancel()
+        except Exception:
+            pass
+
+
+class BoundModel:
+    """An (api_key, model_name) pair on a shared client, safe to hand to worker threads."""
+
+    def __init__(self, client, api_key, model_name):
+        self.client = client
+        self.api_key = api_key
+        self.model_name = model_name
+
+    def generate(self, prompt, **kwargs):
+        return self.client.generate(self.api_key, self.model_name, prompt, **kwargs)
+
+    def generate_batch(self, prompts, **kwargs):
+        return self.client.generate_batch(self.api_key, self.model_name, prompts, **kwargs)
+
+    def stream(self, prompt, **kwargs):
+        return self.client.stream(self.api_key, self.model_name, prompt, **kwargs)
+
+    def stream_batch(self, prompts, **kwargs):
+        return self.client.stream_batch(self.api_key, self.model_name, prompts, **kwargs)
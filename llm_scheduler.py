@@ -0,0 +1,285 @@
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+# --- LLM ADMISSION CONTROL ---
+# One scheduler per process sits in front of every Gemini call. At most
+# ``limit`` calls run at once; the rest wait in per-user FIFO queues that
+# are served round-robin, so one session firing many requests cannot starve
+# the others, and higher priority classes (teacher tools) are always served
+# before lower ones. The limit backs off multiplicatively on quota errors
+# and creeps back up on success (AIMD), which keeps throughput near the
+# quota ceiling instead of collapsing into retries. When the queue is full
+# or a call has waited too long it is shed with Overloaded so the caller
+# can fall back (question bank, static quiz) instead of hanging.
+#
+# Pooled work (LLMClient's batches) is queued here on the caller's thread
+# with submit() and only handed to a worker thread once its ticket is
+# granted, so every waiting call is visible to the fair queue and to
+# shedding, and worker threads never sit idle on an ungranted ticket.
+
+PRIORITY_TEACHER = 0
+PRIORITY_STUDENT = 1
+PRIORITY_BACKGROUND = 2
+
+
+class Overloaded(Exception):
+    """The scheduler shed this call; ``retry_after`` is a rough wait estimate in seconds."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Caller:
+    __slots__ = ("user", "priority", "on_wait", "thread")
+
+    def __init__(self, user, priority, on_wait, thread):
+        self.user = user
+        self.priority = priority
+        self.on_wait = on_wait
+        self.thread = thread
+
+
+_ANONYMOUS = _Caller(None, PRIORITY_STUDENT, None, None)
+_current = contextvars.ContextVar("llm_caller", default=_ANONYMOUS)
+
+
+@contextmanager
+def llm_caller(user, priority=PRIORITY_STUDENT, on_wait=None):
+    """Attribute LLM calls made in this block to ``user`` at ``priority``.
+
+    ``on_wait(position, eta_seconds)`` is called periodically while a call
+    is queued, but only on the thread that entered the block, so it may
+    safely update Streamlit elements. Work submitted to LLMClient's thread
+    pool inherits the caller.
+    """
+    token = _current.set(_Caller(user, priority, on_wait, threading.get_ident()))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+class _Ticket:
+    __slots__ = ("user", "priority", "enqueued", "granted", "started", "on_ready")
+
+    def __init__(self, user, priority, on_ready=None):
+        self.user = user
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.started = None
+        self.on_ready = on_ready     # set for submit()ted tickets, which no thread waits on
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrent=8, max_queue=100, max_wait=90.0, is_quota_error=None,
+                 poll_interval=0.5, initial_service_time=5.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.is_quota_error = is_quota_error or (lambda e: False)
+        self.poll_interval = poll_interval
+        self.limit = float(max_concurrent)
+        self._cond = threading.Condition()
+        self._queues = {}          # priority -> OrderedDict(user -> deque of tickets), users in round-robin order
+        self._queued = 0
+        self._active = 0
+        self._service_time = initial_service_time   # EWMA of seconds a call holds its slot
+        self.shed = 0
+
+    # --- queue bookkeeping (caller holds self._cond) ---
+    def _admit(self, caller, on_ready=None):
+        # Shed background work early and everything else only when the queue is full
+        cap = self.max_queue // 2 if caller.priority >= PRIORITY_BACKGROUND else self.max_queue
+        if self._queued >= cap and caller.priority > PRIORITY_TEACHER:
+            self.shed += 1
+            raise Overloaded("The AI service is at capacity. Please try again shortly.",
+                             retry_after=self._eta(self._queued))
+        ticket = _Ticket(caller.user, caller.priority, on_ready)
+        self._queues.setdefault(caller.priority, OrderedDict()).setdefault(caller.user, deque()).append(ticket)
+        self._queued += 1
+        return ticket
+
+    def _dispatch(self):
+        """Grant queued tickets up to the limit; returns the callbacks to run once the lock is released."""
+        ready = self._expire()
+        granted = False
+        while self._active < max(1, int(self.limit)) and self._queued:
+            users = self._queues[min(p for p, q in self._queues.items() if q)]
+            user, tickets = next(iter(users.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                users.move_to_end(user)
+            else:
+                del users[user]
+            self._queued -= 1
+            self._active += 1
+            ticket.granted = True
+            ticket.started = time.monotonic()
+            granted = True
+            if ticket.on_ready is not None:
+                ready.append((ticket, None))
+        if granted:
+            self._cond.notify_all()
+        return ready
+
+    def _expire(self):
+        # Submitted tickets have no waiting thread to time them out, so they are swept here
+        now = time.monotonic()
+        expired = [t for p, users in self._queues.items() if p > PRIORITY_TEACHER
+                   for tickets in users.values() for t in tickets
+                   if t.on_ready is not None and now - t.enqueued > self.max_wait]
+        ready = []
+        for ticket in expired:
+            position = self._position(ticket)
+            self._remove(ticket)
+            self.shed += 1
+            ready.append((ticket, Overloaded(f"Waited {now - ticket.enqueued:.0f}s for the AI service. "
+                                             "Please try again shortly.", retry_after=self._eta(position))))
+        return ready
+
+    @staticmethod
+    def _run_ready(ready):
+        for ticket, error in ready:
+            ticket.on_ready(ticket, error)
+
+    def _remove(self, ticket):
+        users = self._queues.get(ticket.priority, {})
+        tickets = users.get(ticket.user)
+        if tickets is not None and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del users[ticket.user]
+            self._queued -= 1
+
+    def _position(self, ticket):
+        """1-based place in the grant order, simulating the round-robin."""
+        ahead = sum(sum(len(t) for t in users.values()) for p, users in self._queues.items() if p < ticket.priority)
+        users = self._queues.get(ticket.priority, {})
+        own = users.get(ticket.user)
+        if own is None or ticket not in own:
+            return 0
+        k = own.index(ticket)
+        before = True
+        for user, tickets in users.items():
+            if user == ticket.user:
+                before = False
+                ahead += k
+                continue
+            ahead += min(len(tickets), k + 1 if before else k)
+        return ahead + 1
+
+    def _eta(self, position):
+        return position * self._service_time / max(1, int(self.limit))
+
+    # --- public API ---
+    def acquire(self):
+        caller = _current.get()
+        notify = caller.on_wait if caller.thread == threading.get_ident() else None
+        with self._cond:
+            ticket = self._admit(caller)
+            ready = self._dispatch()
+        self._run_ready(ready)
+
+        try:
+            while True:
+                with self._cond:
+                    if not ticket.granted:
+                        self._cond.wait(self.poll_interval)
+                    if ticket.granted:
+                        break
+                    position = self._position(ticket)
+                    waited = time.monotonic() - ticket.enqueued
+                    if waited > self.max_wait and caller.priority > PRIORITY_TEACHER:
+                        self._remove(ticket)
+                        self.shed += 1
+                        raise Overloaded(f"Waited {waited:.0f}s for the AI service. Please try again shortly.",
+                                         retry_after=self._eta(position))
+                # Outside the lock: the callback may touch Streamlit, which can raise to stop the script
+                if notify:
+                    notify(position, self._eta(position))
+        except BaseException:
+            ready = []
+            with self._cond:
+                if ticket.granted:
+                    self._active -= 1
+                    ready = self._dispatch()
+                else:
+                    self._remove(ticket)
+            self._run_ready(ready)
+            raise
+        return ticket
+
+    def submit(self, on_ready):
+        """Queue a call for the current caller without blocking and return its ticket.
+
+        ``on_ready(ticket, None)`` runs once the ticket is granted, and
+        ``on_ready(ticket, Overloaded(...))`` if it is shed after waiting
+        longer than ``max_wait``; either may run on any thread, so it should
+        only hand work off. A granted ticket is passed to ``slot(ticket)``,
+        which releases it. Raises Overloaded at once when the queue is full.
+        """
+        with self._cond:
+            ticket = self._admit(_current.get(), on_ready)
+            ready = self._dispatch()
+        self._run_ready(ready)
+        return ticket
+
+    def cancel(self, ticket):
+        """Withdraw a submitted ticket that has not been granted yet."""
+        with self._cond:
+            if not ticket.granted:
+                self._remove(ticket)
+
+    def expire(self):
+        """Shed submitted tickets that have waited too long; call periodically while waiting on them."""
+        with self._cond:
+            ready = self._expire()
+        self._run_ready(ready)
+
+    def release(self, ticket, ok=True, quota=False):
+        with self._cond:
+            self._active -= 1
+            if quota:
+                self.limit = max(1.0, self.limit * 0.7)
+            elif ok:
+                self.limit = min(float(self.max_concurrent), self.limit + 1 / self.limit)
+                self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - ticket.started)
+            ready = self._dispatch()
+        self._run_ready(ready)
+
+    @contextmanager
+    def slot(self, ticket=None):
+        """Hold a call slot for the block; ``ticket`` is one already granted through submit()."""
+        if ticket is None:
+            ticket = self.acquire()
+        ok, quota = True, False
+        try:
+            yield ticket
+        except Exception as e:
+            ok, quota = False, self.is_quota_error(e)
+            raise
+        finally:
+            self.release(ticket, ok, quota)
+
+    def notify_waiting(self):
+        """Report the caller's queue position from a thread that is blocked on pooled work."""
+        caller = _current.get()
+        if caller.on_wait is None or caller.thread != threading.get_ident():
+            return
+        with self._cond:
+            tickets = [t for users in self._queues.values() for t in users.get(caller.user, ())]
+            if not tickets:
+                return
+            position = min(self._position(t) for t in tickets)
+        caller.on_wait(position, self._eta(position))
+
+    def stats(self):
+        with self._cond:
+            return {"active": self._active, "queued": self._queued, "limit": int(self.limit),
+                    "service_time": self._service_time, "shed": self.shed}
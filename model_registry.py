@@ -0,0 +1,151 @@
+import random
+import threading
+import time
+from collections import deque
+
+
+# --- MODEL REGISTRY ---
+# Which Gemini models a key can use, and how each one has actually been
+# behaving. Model lists are cached per key and refreshed in the background
+# once they are older than the TTL, so the sidebar never waits on
+# list_models() after the first load. Every call made through LLMClient
+# records its latency or error here; routing then prefers the fastest
+# healthy model and steps around ones that are slow, failing, or over quota.
+
+MODELS_TTL = 600.0        # seconds before a key's model list is refreshed
+FAILED_LIST_TTL = 30.0    # retry a failed list_models() after this long
+SAMPLE_WINDOW = 100       # latency samples kept per model
+ERROR_WINDOW = 300.0      # seconds of outcomes used for the error rate
+MAX_ERROR_RATE = 0.5      # above this (with MIN_SAMPLES outcomes) a model is unhealthy
+MIN_SAMPLES = 4
+QUOTA_COOLDOWN = 60.0     # seconds a model is skipped for a key after a quota error
+SLOW_FACTOR = 2.0         # selected model is "slow" if its p50 is this many times the best
+EXPLORE_RATE = 0.05       # share of auto-routed calls sent to an unmeasured model
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    i = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+
+class _ModelStats:
+    def __init__(self):
+        self.latencies = deque(maxlen=SAMPLE_WINDOW)
+        self.outcomes = deque()   # (timestamp, ok)
+
+    def add(self, seconds, ok, now):
+        if ok:
+            self.latencies.append(seconds)
+        self.outcomes.append((now, ok))
+        while self.outcomes and now - self.outcomes[0][0] > ERROR_WINDOW:
+            self.outcomes.popleft()
+
+    def error_rate(self, now):
+        recent = [ok for t, ok in self.outcomes if now - t <= ERROR_WINDOW]
+        if len(recent) < MIN_SAMPLES:
+            return 0.0
+        return 1 - sum(recent) / len(recent)
+
+    def summary(self, now):
+        values = sorted(self.latencies)
+        return {
+            "calls": len(self.outcomes),
+            "p50": _percentile(values, 0.5),
+            "p95": _percentile(values, 0.95),
+            "error_rate": self.error_rate(now),
+        }
+
+
+class ModelRegistry:
+    def __init__(self, fetch_models, ttl=MODELS_TTL):
+        """``fetch_models(api_key)`` returns the model names usable with that key."""
+        self.fetch_models = fetch_models
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._lists = {}          # api_key -> (models, expires_at)
+        self._refreshing = set()
+        self._stats = {}          # model name -> _ModelStats (latency is a property of the model)
+        self._cooldown = {}       # (api_key, model) -> monotonic time it may be used again
+
+    # --- model lists ---
+    def _fetch(self, api_key):
+        try:
+            models = list(self.fetch_models(api_key))
+            expires = time.monotonic() + self.ttl
+        except Exception:
+            models, expires = None, time.monotonic() + FAILED_LIST_TTL
+        with self._lock:
+            if models is None:
+                # Keep serving the last good list if there is one
+                models = self._lists.get(api_key, ([], 0))[0]
+            self._lists[api_key] = (models, expires)
+            self._refreshing.discard(api_key)
+        return models
+
+    def models(self, api_key):
+        """Model names for ``api_key``. Only the very first call for a key blocks."""
+        with self._lock:
+            entry = self._lists.get(api_key)
+            if entry is not None:
+                models, expires = entry
+                if time.monotonic() >= expires and api_key not in self._refreshing:
+                    self._refreshing.add(api_key)
+                    threading.Thread(target=self._fetch, args=(api_key,), daemon=True, name="model-refresh").start()
+                return models
+        return self._fetch(api_key)
+
+    def known_models(self, api_key):
+        with self._lock:
+            return self._lists.get(api_key, ([], 0))[0]
+
+    # --- measurements ---
+    def record(self, api_key, model, seconds, ok=True, quota=False):
+        now = time.monotonic()
+        with self._lock:
+            self._stats.setdefault(model, _ModelStats()).add(seconds, ok, now)
+            if quota:
+                self._cooldown[(api_key, model)] = now + QUOTA_COOLDOWN
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {name: s.summary(now) for name, s in sorted(self._stats.items())}
+
+    # --- routing ---
+    def _healthy(self, api_key, model, now):
+        if self._cooldown.get((api_key, model), 0) > now:
+            return False
+        stats = self._stats.get(model)
+        return stats is None or stats.error_rate(now) <= MAX_ERROR_RATE
+
+    def _p50(self, model):
+        stats = self._stats.get(model)
+        return _percentile(sorted(stats.latencies), 0.5) if stats and stats.latencies else None
+
+    def pick(self, api_key, preferred=None, avoid=()):
+        """Choose the model for the next call.
+
+        ``preferred`` is used while it is healthy and not much slower than
+        the best measured alternative; with no preference the fastest
+        healthy model wins. ``avoid`` lists models that already failed this
+        request. Falls back to ``preferred`` when nothing better is known.
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [m for m in self._lists.get(api_key, ([], 0))[0]
+                          if m not in avoid and self._healthy(api_key, m, now)]
+            measured = sorted((p, m) for m in candidates if (p := self._p50(m)) is not None)
+            unmeasured = [m for m in candidates if self._p50(m) is None]
+
+            if preferred and preferred not in avoid and self._healthy(api_key, preferred, now):
+                p50 = self._p50(preferred)
+                if p50 is None or not measured or p50 <= SLOW_FACTOR * measured[0][0]:
+                    return preferred
+            if unmeasured and (not measured or (not preferred and random.random() < EXPLORE_RATE)):
+                # Nothing measured yet: start with the flash models, as the sidebar used to
+                return next((m for m in unmeasured if "flash" in m), unmeasured[0])
+            if measured:
+                return measured[0][1]
+        return preferred
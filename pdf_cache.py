@@ -0,0 +1,194 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# --- CONTENT-ADDRESSED PDF TEXT CACHE ---
+# Two tiers: an in-memory LRU (bounded by total characters) in front of an
+# on-disk store (bounded by total bytes). Keys are the SHA-256 of the raw
+# uploaded bytes (plus any extraction limits that shape the text), so the
+# same syllabus uploaded by any session maps to the same entry and is only
+# parsed once per server.
+
+def content_key(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class PdfTextCache:
+    def __init__(self, cache_dir=".pdf_cache", max_memory_chars=64 * 1024 * 1024, max_disk_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_chars = max_memory_chars
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_chars = 0
+        self._inflight = {}
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    # --- memory tier ---
+    def _memory_get(self, key):
+        text = self._memory.get(key)
+        if text is not None:
+            self._memory.move_to_end(key)
+        return text
+
+    def _memory_put(self, key, text):
+        if len(text) > self.max_memory_chars:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_chars -= len(old)
+        self._memory[key] = text
+        self._memory_chars += len(text)
+        while self._memory_chars > self.max_memory_chars:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_chars -= len(evicted)
+
+    # --- disk tier ---
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.txt")
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".txt"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _disk_get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return None
+        # Bump mtime so eviction treats this entry as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return text
+
+    def _disk_put(self, key, text):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data = text.encode("utf-8")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            existing = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self._disk_bytes += len(data) - existing
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        with self._lock:
+            self._disk_bytes = total
+
+    # --- public API ---
+    def get(self, key):
+        with self._lock:
+            text = self._memory_get(key)
+            if text is not None:
+                self.hits += 1
+                return text
+        text = self._disk_get(key)
+        if text is not None:
+            with self._lock:
+                self.hits += 1
+                self.disk_hits += 1
+                self._memory_put(key, text)
+        return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._memory_put(key, text)
+        self._disk_put(key, text)
+
+    def get_or_compute(self, data, compute, variant=None):
+        """Return cached text for ``data`` or run ``compute(data)`` once.
+
+        ``variant`` names the settings ``compute`` extracts with (e.g. a size
+        limit); text cached under other settings is not reused. Concurrent
+        callers with the same bytes wait on the first parse instead of
+        parsing the document again. Exceptions from ``compute`` propagate
+        and nothing is cached.
+        """
+        key = content_key(data)
+        if variant is not None:
+            key = hashlib.sha256(f"{key}|{variant}".encode("utf-8")).hexdigest()
+        text = self.get(key)
+        if text is not None:
+            return text
+
+        with self._lock:
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = self._inflight[key] = threading.Event()
+                self.misses += 1
+
+        if not owner:
+            event.wait()
+            text = self.get(key)
+            if text is not None:
+                return text
+            return compute(data)
+
+        try:
+            text = compute(data)
+            self.put(key, text)
+            return text
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_chars": self._memory_chars,
+                "disk_bytes": self._disk_bytes,
+                "evictions": self.evictions,
+                "checked_at": time.time(),
+            }
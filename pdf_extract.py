@@ -0,0 +1,147 @@
+import importlib.util
+import io
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# PyPDF2 is imported on first use so pages that never read a PDF don't pay for it
+HAS_PDF = importlib.util.find_spec("PyPDF2") is not None
+
+
+# --- PARALLEL, STREAMING PAGE EXTRACTION ---
+# Large documents are split into page ranges that run on a shared process
+# pool. Results are yielded page by page, in order, as soon as the range that
+# contains them is finished, so callers can start consuming text before the
+# last page has been parsed. Ranges are submitted lazily: each task carries a
+# pickled copy of the PDF, so only a small window of them is ever in flight,
+# and nothing more is submitted once ``max_bytes`` has been reached. With a
+# single worker the pool only adds pickling and IPC, so pages are read in
+# process. If a worker dies, the broken pool is dropped and the rest of the
+# document is read in process too.
+
+PAGES_PER_TASK = 16
+PARALLEL_MIN_PAGES = 32
+POOL_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+TASK_WINDOW = POOL_WORKERS + 1    # ranges in flight per document: one per worker plus one queued
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the Streamlit server is multi-threaded
+            _pool = ProcessPoolExecutor(
+                max_workers=POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_range(data, start, stop):
+    # Runs in a worker process
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    pages = []
+    for i in range(start, stop):
+        pages.append(reader.pages[i].extract_text() or "")
+    return pages
+
+
+def _resolve_range(num_pages, page_range):
+    if page_range is None:
+        return 0, num_pages
+    start, stop = page_range
+    start = max(0, start or 0)
+    stop = num_pages if stop is None else min(stop, num_pages)
+    return start, max(start, stop)
+
+
+def iter_pdf_pages(data, page_range=None, max_bytes=None, parallel=None, timeout=None):
+    """Yield ``(page_number, text)`` for each page of the PDF in ``data``.
+
+    ``page_range`` is a ``(start, stop)`` pair of zero-based page indices
+    (either side may be ``None``). ``max_bytes`` caps the total UTF-8 size of
+    the yielded text; the page that crosses the limit is truncated and
+    extraction stops. ``parallel`` forces the process pool on or off; by
+    default it is used once the range is at least ``PARALLEL_MIN_PAGES`` long
+    and the pool has more than one worker.
+    ``timeout`` bounds the wait for each page range, in seconds.
+    """
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    start, stop = _resolve_range(len(reader.pages), page_range)
+    if parallel is None:
+        parallel = POOL_WORKERS > 1 and (stop - start) >= PARALLEL_MIN_PAGES
+
+    remaining = max_bytes
+
+    def clip(text):
+        nonlocal remaining
+        if remaining is None:
+            return text, False
+        encoded = text.encode("utf-8")
+        if len(encoded) <= remaining:
+            remaining -= len(encoded)
+            return text, False
+        text = encoded[:remaining].decode("utf-8", errors="ignore")
+        remaining = 0
+        return text, True
+
+    next_page = start
+    if parallel:
+        pool = get_pool()
+        starts = iter(range(start, stop, PAGES_PER_TASK))
+        window = deque()
+
+        def submit_next():
+            s = next(starts, None)
+            if s is not None:
+                window.append((s, pool.submit(_extract_range, data, s, min(s + PAGES_PER_TASK, stop))))
+
+        try:
+            for _ in range(TASK_WINDOW):
+                submit_next()
+            while window:
+                s, future = window.popleft()
+                pages = future.result(timeout=timeout)
+                submit_next()
+                for offset, page_text in enumerate(pages):
+                    text, done = clip(page_text)
+                    yield s + offset, text
+                    if done:
+                        return
+                next_page = s + len(pages)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+        finally:
+            for _, future in window:
+                future.cancel()
+
+    for i in range(next_page, stop):
+        text, done = clip(reader.pages[i].extract_text() or "")
+        yield i, text
+        if done:
+            return
+
+
+def extract_text(data, page_range=None, max_bytes=None, parallel=None, timeout=None):
+    parts = []
+    for _, text in iter_pdf_pages(data, page_range, max_bytes, parallel, timeout):
+        if text:
+            parts.append(text)
+            parts.append("\n")
+    return "".join(parts)
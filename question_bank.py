@@ -0,0 +1,222 @@
+"""Persistent pool of pre-generated quiz questions.
+
+Questions are stored per (subject, chapter, difficulty, document hash) so a
+quiz can be drawn instantly instead of waiting on Gemini. A background
+refiller tops a pool up when it runs low, and the ``prefill`` command fills
+every SYLLABUS chapter ahead of term:
+
+    python question_bank.py prefill --pdf syllabus.pdf --api-key KEY [--per-chapter 30]
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from quiz_generation import chapter_context, generate_questions_parallel, is_valid_question, question_hash
+from syllabus import SYLLABUS
+
+BANK_FILE = "question_bank.db"
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+
+BankKey = namedtuple("BankKey", ["subject", "chapter", "difficulty", "doc_hash"])
+
+
+class QuestionBank:
+    def __init__(self, path=BANK_FILE):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS questions (
+                    id INTEGER PRIMARY KEY,
+                    subject TEXT NOT NULL,
+                    chapter TEXT NOT NULL,
+                    difficulty TEXT NOT NULL,
+                    doc_hash TEXT NOT NULL,
+                    q_hash TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    served INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    UNIQUE (subject, chapter, difficulty, doc_hash, q_hash)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_key ON questions (subject, chapter, difficulty, doc_hash, served)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add(self, key, questions):
+        """Store valid, previously unseen questions under ``key``. Returns the number added."""
+        rows = [
+            (*key, question_hash(q), json.dumps(q), time.time())
+            for q in questions if is_valid_question(q)
+        ]
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO questions (subject, chapter, difficulty, doc_hash, q_hash, payload, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return conn.total_changes - before
+
+    def stock(self, key):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM questions WHERE subject = ? AND chapter = ? AND difficulty = ? AND doc_hash = ?",
+                tuple(key),
+            ).fetchone()[0]
+
+    def fresh(self, key):
+        """Questions under ``key`` that no quiz has been served yet."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM questions WHERE subject = ? AND chapter = ? AND difficulty = ? AND doc_hash = ? AND served = 0",
+                tuple(key),
+            ).fetchone()[0]
+
+    def draw(self, key, count, other_documents=False):
+        """Return up to ``count`` questions, favouring the least-served ones.
+
+        With ``other_documents`` the questions come from the same chapter
+        and difficulty but any other document (including the prefill's),
+        which lets a quiz start from another copy of the syllabus.
+        """
+        where = "subject = ? AND chapter = ? AND difficulty = ? AND doc_hash " + ("!= ?" if other_documents else "= ?")
+        params = [key.subject, key.chapter, key.difficulty, key.doc_hash]
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, payload FROM questions WHERE {where} ORDER BY served, RANDOM() LIMIT ?",
+                (*params, count),
+            ).fetchall()
+            conn.executemany("UPDATE questions SET served = served + 1 WHERE id = ?", [(r[0],) for r in rows])
+        picked = [json.loads(r[1]) for r in rows]
+        random.shuffle(picked)
+        return picked
+
+
+# --- BACKGROUND REFILL ---
+class BankRefiller:
+    """Single worker thread that tops pools up to ``target`` unserved questions.
+
+    ``request(key, generate)`` is cheap and idempotent while a refill for the
+    same key is pending. ``generate(count)`` must return a list of question
+    dicts and must not depend on Streamlit session state.
+    """
+
+    def __init__(self, bank, low_water=10, target=30, batch_size=10):
+        self.bank = bank
+        self.low_water = low_water
+        self.target = target
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="question-bank-refill", daemon=True)
+        self._thread.start()
+
+    def needs_refill(self, key):
+        # Served questions never leave the pool, so only unserved ones count:
+        # otherwise a pool that once reached ``target`` would repeat forever
+        return self.bank.fresh(key) < self.low_water
+
+    def request(self, key, generate):
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        self._queue.put((key, generate))
+        return True
+
+    def _run(self):
+        while True:
+            key, generate = self._queue.get()
+            try:
+                fill(self.bank, key, generate, self.target, self.batch_size)
+            except Exception:
+                # A failed refill just leaves the pool low; the next quiz start asks again
+                pass
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+
+def fill(bank, key, generate, target, batch_size=10, max_rounds=5):
+    """Generate batches until ``key`` holds ``target`` unserved questions or progress stalls."""
+    for _ in range(max_rounds):
+        missing = target - bank.fresh(key)
+        if missing <= 0:
+            return
+        if bank.add(key, generate(min(batch_size, missing))) == 0:
+            return
+
+
+# --- OFFLINE PREFILL ---
+def prefill(bank, llm, pdf_bytes=None, per_chapter=30, difficulties=DIFFICULTIES, token_budget=3000, log=print):
+    from retrieval import RetrievalIndex
+
+    index = None
+    doc_hash = ""
+    if pdf_bytes is not None:
+        from pdf_cache import content_key
+        from pdf_extract import extract_text
+        index = RetrievalIndex(extract_text(pdf_bytes))
+        doc_hash = content_key(pdf_bytes)
+
+    for subject, info in SYLLABUS.items():
+        for chapter in info["chapters"]:
+            if index is not None:
+                excerpt = index.search(f"{subject} {chapter}", token_budget)
+            else:
+                excerpt = f"{subject}: {chapter}"
+            context = chapter_context(subject, chapter, excerpt)
+            for difficulty in difficulties:
+                key = BankKey(subject, chapter, difficulty, doc_hash)
+                try:
+                    fill(bank, key, lambda n: generate_questions_parallel(llm, context, n, difficulty), per_chapter)
+                except Exception as e:
+                    log(f"{subject} / {chapter} / {difficulty}: failed ({e})")
+                    continue
+                log(f"{subject} / {chapter} / {difficulty}: {bank.stock(key)} questions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("prefill", help="generate questions for every SYLLABUS chapter")
+    p.add_argument("--pdf", help="syllabus PDF students will upload (questions are keyed by its hash)")
+    p.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"))
+    p.add_argument("--model", default="gemini-1.5-flash")
+    p.add_argument("--per-chapter", type=int, default=30)
+    p.add_argument("--difficulty", action="append", choices=DIFFICULTIES)
+    p.add_argument("--bank", default=BANK_FILE)
+    args = parser.parse_args()
+
+    if not args.api_key:
+        sys.exit("An API key is required (--api-key or GEMINI_API_KEY).")
+
+    from llm_client import LLMClient
+    llm = LLMClient().bind(args.api_key, args.model)
+
+    pdf_bytes = None
+    if args.pdf:
+        with open(args.pdf, "rb") as f:
+            pdf_bytes = f.read()
+
+    prefill(QuestionBank(args.bank), llm, pdf_bytes, args.per_chapter, args.difficulty or DIFFICULTIES)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import ast
+import hashlib
+import itertools
+import json
+
+
+# --- QUIZ GENERATION ---
+# Prompt building and response parsing shared by the Streamlit pages and
+# the offline question-bank jobs. Nothing in here touches st.session_state.
+#
+# Responses are constrained to a JSON array of question objects and parsed
+# incrementally: each object is accepted as soon as its closing brace
+# arrives, and a malformed object costs only itself, not the whole response.
+
+QUESTION_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "q": {"type": "string"},
+            "opts": {"type": "array", "items": {"type": "string"}},
+            "ans": {"type": "string"},
+        },
+        "required": ["q", "opts", "ans"],
+    },
+}
+GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": QUESTION_SCHEMA}
+
+def build_question_prompt(context_text, count, difficulty):
+    return f"""
+            You are a strict Engineering Professor. Generate {count} multiple-choice questions (MCQs).
+            STRICTLY base the questions ONLY on the concepts, formulas, and topics found in the following syllabus text:
+
+            "{context_text}"
+
+            Difficulty Level: {difficulty}.
+            Do NOT ask generic or meta questions like "What is the subject about?".
+            Ask highly technical questions regarding the actual engineering principles inside the chapter.
+
+            Return a JSON array of objects. NO markdown.
+            Format: [{{"q": "Question Text", "opts": ["A", "B", "C", "D"], "ans": "Correct Option Text"}}]
+            """
+
+
+def chapter_context(subject, chapter, excerpt):
+    return f"Subject: {subject}, Chapter: {chapter}.\nThe following syllabus excerpts were selected for this subject and chapter. Generate questions ONLY from these exact topics:\n\n{excerpt}"
+
+
+def is_valid_question(q):
+    return (
+        isinstance(q, dict)
+        and isinstance(q.get("q"), str) and q["q"].strip()
+        and isinstance(q.get("opts"), list) and len(q["opts"]) >= 2
+        and all(isinstance(o, str) for o in q["opts"])
+        and q.get("ans") in q["opts"]
+    )
+
+
+def question_hash(q):
+    return hashlib.sha256(q["q"].strip().lower().encode("utf-8")).hexdigest()
+
+
+class QuestionParser:
+    """Incremental parser for a streamed array of question objects.
+
+    ``feed(text)`` returns the valid questions completed by that chunk, and
+    ``close()`` any that only the end of the stream settles. Anything
+    outside a top-level ``{...}`` (brackets, commas, code fences, chatter)
+    is skipped, and objects that do not parse or fail ``is_valid_question``
+    are counted in ``rejected`` and dropped.
+
+    A string that is never closed would otherwise swallow every later
+    object. While inside a string at an object's top level, the first
+    ``}, {"`` is noted as a possible start of the next object and ``}]`` as
+    a possible end of the array. Such text is also legal string content, so
+    parsing carries on; only if the object then fails to decode, grows past
+    ``MAX_ITEM_CHARS`` or is cut off by the end of the stream is it rejected
+    and the text from the noted boundary parsed again.
+    """
+
+    MAX_ITEM_CHARS = 4000
+
+    def __init__(self):
+        self._reset()
+        self.rejected = 0
+
+    def _reset(self):
+        self._buf = []
+        self._depth = 0
+        self._quote = None
+        self._escape = False
+        self._boundary = 0       # progress through '}' ',' '{' '"' seen inside a string
+        self._next_start = 0     # where that '{' sits in _buf
+        self._restart = None     # first boundary noted in this object: position in _buf to re-parse from
+
+    def feed(self, text):
+        out = []
+        while text:
+            text = self._scan(text, out)
+        return out
+
+    def close(self):
+        """Settle an object left open by the end of the stream."""
+        out = []
+        while self._depth and self._restart is not None:
+            out += self.feed(self._retry())
+        self._reset()
+        return out
+
+    def _scan(self, text, out):
+        """Parse ``text`` into ``out``; returns text still to parse after a resync."""
+        for i, ch in enumerate(text):
+            if self._depth:
+                self._buf.append(ch)
+                if len(self._buf) > self.MAX_ITEM_CHARS:
+                    if self._restart is not None:
+                        return self._retry() + text[i + 1:]
+                    self.rejected += 1
+                    self._reset()
+                    continue
+            if self._quote:
+                if self._escape:
+                    self._escape = False
+                    self._boundary = 0
+                elif ch == "\\":
+                    self._escape = True
+                    self._boundary = 0
+                else:
+                    if self._depth == 1:
+                        self._note_boundary(ch)
+                    if ch == self._quote:
+                        self._quote = None
+            elif self._depth and ch in "\"'":
+                self._quote = ch
+                self._boundary = 0
+            elif ch == "{":
+                if not self._depth:
+                    self._buf = [ch]
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if not self._depth:
+                    q = self._decode("".join(self._buf))
+                    if is_valid_question(q):
+                        out.append(q)
+                        self._reset()
+                    elif self._restart is not None:
+                        return self._retry() + text[i + 1:]
+                    else:
+                        self.rejected += 1
+                        self._reset()
+        return ""
+
+    def _note_boundary(self, ch):
+        """Track ``}, {"`` and ``}]`` inside a string; the first complete one becomes ``_restart``."""
+        state = self._boundary
+        if ch == "}":
+            state = 1
+        elif ch.isspace() and state:
+            pass
+        elif ch == "," and state == 1:
+            state = 2
+        elif ch == "{" and state == 2:
+            state = 3
+            self._next_start = len(self._buf) - 1
+        elif ch in "\"'" and state == 3:
+            if self._restart is None:
+                self._restart = self._next_start
+            state = 0
+        elif ch == "]" and state == 1:
+            if self._restart is None:
+                self._restart = len(self._buf)
+            state = 0
+        else:
+            state = 0
+        self._boundary = state
+
+    def _retry(self):
+        """Reject the current object; returns the text from its noted boundary on."""
+        text = "".join(self._buf[self._restart:])
+        self.rejected += 1
+        self._reset()
+        return text
+
+    @staticmethod
+    def _decode(item):
+        try:
+            return json.loads(item)
+        except ValueError:
+            pass
+        try:
+            # Models without schema support sometimes answer with Python dict syntax
+            return ast.literal_eval(item)
+        except (ValueError, SyntaxError):
+            return None
+
+
+def _chunk_sizes(count, chunk_size):
+    sizes = [chunk_size] * (count // chunk_size)
+    if count % chunk_size:
+        sizes.append(count % chunk_size)
+    return sizes
+
+
+def stream_questions(llm, context_text, count, difficulty, chunk_size=5, max_rounds=3):
+    """Yield up to ``count`` unique questions as soon as each one parses.
+
+    The quiz is split into ``chunk_size`` requests that stream concurrently.
+    If some items are malformed or duplicated, further rounds ask only for
+    the questions still missing. Raises the first error only if no question
+    at all could be produced.
+    """
+    seen, errors = set(), []
+    for _ in range(max_rounds):
+        missing = count - len(seen)
+        if missing <= 0:
+            return
+        sizes = _chunk_sizes(missing, chunk_size)
+        parsers = [QuestionParser() for _ in sizes]
+        prompts = [build_question_prompt(context_text, n, difficulty) for n in sizes]
+        stream = llm.stream_batch(prompts, generation_config=GENERATION_CONFIG)
+        failed = 0
+        ends = ((i, None) for i in range(len(parsers)))   # once every stream is done, close each parser
+        try:
+            for i, chunk in itertools.chain(stream, ends):
+                if isinstance(chunk, Exception):
+                    errors.append(chunk)
+                    failed += 1
+                    continue
+                parser = parsers[i]
+                for q in parser.feed(chunk) if chunk is not None else parser.close():
+                    h = question_hash(q)
+                    if h not in seen:
+                        seen.add(h)
+                        yield q
+                        if len(seen) >= count:
+                            return
+        finally:
+            stream.close()
+        if failed == len(sizes):
+            break   # every request in this round failed outright; don't keep paying for retries
+    if not seen and errors:
+        raise errors[0]
+
+
+def generate_questions_parallel(llm, context_text, count, difficulty, chunk_size=5):
+    """Collect :func:`stream_questions` into a list; used where nothing renders progressively."""
+    return list(stream_questions(llm, context_text, count, difficulty, chunk_size))
@@ -0,0 +1,200 @@
+import atexit
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+
+# --- QUIZ RESULTS STORE ---
+# Every answered question becomes one row in a Hive-partitioned Parquet
+# dataset (subject=.../date=...). Appends are buffered in memory and flushed
+# as a new part file, so a write never touches existing data. A maintenance
+# thread flushes the buffer on a timer and periodically compacts partitions
+# that have collected many small part files into one larger file. Readers
+# that keep running aggregates can follow() the store and receive each
+# flushed batch instead of rescanning the dataset.
+
+RESULTS_DIR = "quiz_results"
+
+if HAS_ARROW:
+    SCHEMA = pa.schema([
+        ("attempt_id", pa.string()),
+        ("student", pa.string()),
+        ("subject", pa.string()),
+        ("chapter", pa.string()),
+        ("difficulty", pa.string()),
+        ("question_hash", pa.string()),
+        ("chosen", pa.string()),
+        ("correct", pa.bool_()),
+        ("ts", pa.timestamp("ms", tz="UTC")),
+    ])
+
+
+class ResultsStore:
+    def __init__(self, root=RESULTS_DIR, flush_rows=500, flush_interval=5.0, compact_interval=600.0, compact_min_files=8):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.compact_min_files = compact_min_files
+
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        # Held while part files are added or replaced so a scan never sees a compaction half-done
+        self._files_lock = threading.Lock()
+        self._followers = []       # (callback, columns)
+        self.version = 0
+
+        os.makedirs(root, exist_ok=True)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._maintain, name="results-maintenance", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    # --- writes ---
+    def record_attempt(self, student, subject, chapter, difficulty, answers):
+        """Buffer one quiz attempt. ``answers`` is a list of ``(question_hash, chosen, correct)``."""
+        attempt_id = uuid.uuid4().hex
+        ts = datetime.now(timezone.utc)
+        rows = [
+            {"attempt_id": attempt_id, "student": student, "subject": subject, "chapter": chapter,
+             "difficulty": difficulty, "question_hash": qh, "chosen": chosen, "correct": bool(correct), "ts": ts}
+            for qh, chosen, correct in answers
+        ]
+        with self._buffer_lock:
+            self._buffer.extend(rows)
+            full = len(self._buffer) >= self.flush_rows
+        if full:
+            self.flush()
+        return attempt_id
+
+    def flush(self):
+        with self._buffer_lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+
+        partitions = {}
+        for r in rows:
+            partitions.setdefault((r["subject"], r["ts"].strftime("%Y-%m-%d")), []).append(r)
+
+        with self._files_lock:
+            pending = list(partitions.items())
+            written = []
+            try:
+                while pending:
+                    (subject, day), part_rows = pending[0]
+                    directory = self._partition_dir(subject, day)
+                    os.makedirs(directory, exist_ok=True)
+                    table = pa.Table.from_pylist(part_rows, schema=SCHEMA)
+                    self._write_atomic(table, os.path.join(directory, f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"))
+                    pending.pop(0)
+                    written.append(table)
+            finally:
+                if pending:
+                    # Put unwritten rows back so the next flush retries them
+                    with self._buffer_lock:
+                        self._buffer[:0] = [r for _, part_rows in pending for r in part_rows]
+                if written:
+                    self._notify(pa.concat_tables(written))
+                self.version += 1
+        return len(rows)
+
+    def _notify(self, table):
+        # Caller holds self._files_lock, so followers see batches in write order and never twice
+        for callback, columns in self._followers:
+            try:
+                callback(table.select(columns) if columns else table)
+            except Exception:
+                # A broken follower must not lose the rows for everyone else
+                pass
+
+    def _partition_dir(self, subject, day):
+        return os.path.join(self.root, f"subject={quote(subject, safe='')}", f"date={day}")
+
+    def _write_atomic(self, table, path):
+        # Dot-prefixed temp name: ignored by scans until the rename
+        tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+
+    # --- compaction ---
+    def compact(self):
+        """Merge each partition's small part files into a single file. Returns files removed."""
+        removed = 0
+        for directory, _, files in os.walk(self.root):
+            parts = sorted(f for f in files if f.endswith(".parquet") and not f.startswith("."))
+            if len(parts) < self.compact_min_files:
+                continue
+            paths = [os.path.join(directory, f) for f in parts]
+            table = pa.concat_tables([pq.read_table(p, schema=SCHEMA) for p in paths]).sort_by("ts")
+            with self._files_lock:
+                self._write_atomic(table, os.path.join(directory, f"compact-{time.time_ns()}.parquet"))
+                for p in paths:
+                    os.remove(p)
+                removed += len(paths)
+                self.version += 1
+        return removed
+
+    def _maintain(self):
+        last_compact = time.monotonic()
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.monotonic() - last_compact >= self.compact_interval:
+                    self.compact()
+                    last_compact = time.monotonic()
+            except Exception:
+                # Keep the thread alive; unwritten rows are retried next tick
+                pass
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    # --- reads ---
+    def _files(self, subjects=None):
+        if subjects is None:
+            roots = [self.root]
+        else:
+            roots = [os.path.join(self.root, f"subject={quote(s, safe='')}") for s in subjects]
+        for root in roots:
+            for directory, _, files in os.walk(root):
+                for f in files:
+                    if f.endswith(".parquet") and not f.startswith("."):
+                        yield os.path.join(directory, f)
+
+    def follow(self, callback, columns=None):
+        """Call ``callback(table)`` with everything flushed so far, then with each newly flushed batch.
+
+        The initial scan and the subscription happen under the same lock, so
+        no batch is missed or delivered twice.
+        """
+        with self._files_lock:
+            files = list(self._files())
+            if files:
+                callback(ds.dataset(files, schema=SCHEMA, format="parquet").to_table(columns=columns))
+            self._followers.append((callback, columns))
+
+    def scan(self, columns=None, filter=None, subjects=None):
+        """Return flushed attempts as a pyarrow Table.
+
+        ``subjects`` prunes whole partitions before any file is opened;
+        ``columns`` and ``filter`` are pushed down into the Parquet reader.
+        """
+        with self._files_lock:
+            files = list(self._files(subjects))
+            if not files:
+                table = SCHEMA.empty_table()
+                return table.select(columns) if columns else table
+            return ds.dataset(files, schema=SCHEMA, format="parquet").to_table(columns=columns, filter=filter)
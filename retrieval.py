@@ -0,0 +1,183 @@
+import math
+import re
+from collections import Counter
+
+
+# --- CHAPTER-SCOPED RETRIEVAL ---
+# A small offline BM25 index over the headings and paragraphs of one
+# document. Instead of pasting a whole syllabus into every prompt, callers
+# ask for the chunks that best match a chapter name or a student question
+# and get back only as much text as fits the token budget.
+
+CHUNK_WORDS = 120
+CHARS_PER_TOKEN = 4   # rough estimate for English prose with Gemini tokenizers
+HEADING_BOOST = 2     # heading terms count this many times in the chunk body
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_HEADING_RE = re.compile(r"^(unit|chapter|module|section|part|topic)\b|^[0-9]+(\.[0-9]+)*[.)]?\s+\S", re.IGNORECASE)
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "its",
+    "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "which", "with",
+    "how", "why", "does", "do", "can", "i", "me", "my", "we", "you", "your", "about", "explain",
+}
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _is_heading(line):
+    words = line.split()
+    if not words or len(words) > 12 or line.endswith((".", ",", ";")):
+        return False
+    if _HEADING_RE.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    if letters and all(c.isupper() for c in letters) and len(letters) > 3:
+        return True
+    return False
+
+
+def chunk_text(text, chunk_words=CHUNK_WORDS):
+    """Split ``text`` into ``(heading, body)`` chunks of roughly ``chunk_words`` words.
+
+    A new chunk starts at every detected heading, at blank lines once the
+    current chunk is half full, and whenever the word limit is reached.
+    Lines longer than the limit (PDF text often has no line breaks at all)
+    are split between words. A heading with no body before the next one
+    (a numbered topic list, say) becomes a chunk of its own with an empty
+    body.
+    """
+    chunks = []
+    heading = ""
+    lines, words = [], 0
+    has_body = False
+
+    def flush():
+        nonlocal lines, words, has_body
+        if lines:
+            chunks.append((heading, "\n".join(lines)))
+            has_body = True
+        lines, words = [], 0
+
+    def close_heading():
+        flush()
+        if heading and not has_body:
+            chunks.append((heading, ""))
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            if words >= chunk_words // 2:
+                flush()
+            continue
+        if _is_heading(line):
+            close_heading()
+            heading, has_body = line, False
+            continue
+        line_words = line.split()
+        for i in range(0, len(line_words), chunk_words):
+            piece = line_words[i:i + chunk_words]
+            lines.append(" ".join(piece) if len(line_words) > chunk_words else line)
+            words += len(piece)
+            if words >= chunk_words:
+                flush()
+    close_heading()
+    return chunks
+
+
+class RetrievalIndex:
+    def __init__(self, text, chunk_words=CHUNK_WORDS, k1=1.5, b=0.75):
+        self.chunks = chunk_text(text, chunk_words)
+        self.k1 = k1
+        self.b = b
+
+        self._tfs = []
+        self._lengths = []
+        df = Counter()
+        for heading, body in self.chunks:
+            terms = tokenize(body) + tokenize(heading) * HEADING_BOOST
+            tf = Counter(terms)
+            self._tfs.append(tf)
+            self._lengths.append(len(terms))
+            df.update(tf.keys())
+
+        n = len(self.chunks)
+        self._avg_len = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def score(self, query):
+        terms = tokenize(query)
+        scores = [0.0] * len(self.chunks)
+        if not terms or not self.chunks:
+            return scores
+        for i, tf in enumerate(self._tfs):
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / (self._avg_len or 1))
+            s = 0.0
+            for t in terms:
+                f = tf.get(t)
+                if f:
+                    s += self._idf[t] * f * (self.k1 + 1) / (f + norm)
+            scores[i] = s
+        return scores
+
+    def _render(self, picked):
+        parts = []
+        last_heading = None
+        for i in sorted(picked):
+            heading, body = self.chunks[i]
+            if heading and heading != last_heading:
+                parts.append(heading)
+                last_heading = heading
+            if body:
+                parts.append(body)
+        return "\n\n".join(parts)
+
+    def _fit(self, order, token_budget):
+        picked, used = [], 0
+        for i in order:
+            heading, body = self.chunks[i]
+            cost = estimate_tokens(heading) + estimate_tokens(body) + 1
+            if used + cost > token_budget:
+                continue
+            picked.append(i)
+            used += cost
+        return picked
+
+    def _render_fit(self, order, token_budget):
+        picked = self._fit(order, token_budget)
+        if not picked and order:
+            # Not even one chunk fits: send the start of the best one rather than no context at all
+            return self._render(order[:1])[:token_budget * CHARS_PER_TOKEN]
+        return self._render(picked)
+
+    def search(self, query, token_budget):
+        """Return the best-matching chunks for ``query`` in document order.
+
+        Falls back to :meth:`overview` when no chunk shares a term with the
+        query, so the model still gets representative context.
+        """
+        scores = self.score(query)
+        ranked = [i for i in sorted(range(len(scores)), key=lambda i: -scores[i]) if scores[i] > 0]
+        if not ranked:
+            return self.overview(token_budget)
+        return self._render_fit(ranked, token_budget)
+
+    def overview(self, token_budget):
+        """Return chunks spread evenly across the document within ``token_budget``."""
+        n = len(self.chunks)
+        if not n:
+            return ""
+        total = sum(estimate_tokens(h) + estimate_tokens(b) + 1 for h, b in self.chunks)
+        if total <= token_budget:
+            return self._render(range(n))
+        step = max(1, math.ceil(total / token_budget))
+        order = list(range(0, n, step)) + [i for i in range(n) if i % step]
+        return self._render_fit(order, token_budget)
@@ -0,0 +1,136 @@
+import bisect
+import threading
+from collections import OrderedDict, defaultdict
+
+
+# --- ROSTER INDEX ---
+# Built once per roster version (see DataStore.roster_version). Students are
+# ranked by (name, username); prefix search is a bisect over the sorted
+# keys, fuzzy search goes through a trigram index, and subject/attendance
+# filters are precomputed id lists. Unfiltered browsing just slices the
+# sorted list; a filtered or searched result list is built once and kept,
+# so paging through it or rerunning costs O(page_size) no matter how large
+# the roster is.
+
+RESULT_CACHE_SIZE = 32   # filtered/searched result lists kept per index
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class RosterIndex:
+    def __init__(self, students):
+        """``students`` is an iterable of ``(username, record)`` pairs."""
+        entries = sorted(
+            ((info.get("name") or username).lower(), username, info.get("name") or username,
+             info.get("attendance", 0), tuple(info.get("subjects", [])))
+            for username, info in students
+        )
+        self.usernames = [e[1] for e in entries]
+        self.names = [e[2] for e in entries]
+        self.attendance = [e[3] for e in entries]
+        self.subjects = [e[4] for e in entries]
+
+        # Prefix search over names and usernames (ids are positions in the sorted roster)
+        self._name_keys = [e[0] for e in entries]
+        self._user_keys = sorted((e[1].lower(), i) for i, e in enumerate(entries))
+
+        self._by_subject = defaultdict(list)
+        self._trigrams = defaultdict(set)
+        self._gram_counts = []
+        for i, e in enumerate(entries):
+            for subject in e[4]:
+                self._by_subject[subject].append(i)
+            name_grams = _trigrams(e[0])
+            self._gram_counts.append(len(name_grams))
+            for g in name_grams | _trigrams(e[1].lower()):
+                self._trigrams[g].add(i)
+        self._by_attendance = sorted(range(len(entries)), key=lambda i: self.attendance[i])
+        self._attendance_sorted = [self.attendance[i] for i in self._by_attendance]
+
+        self._results = OrderedDict()      # (query, subject, attendance) -> ordered ids
+        self._results_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.usernames)
+
+    def label(self, i):
+        return f"{self.names[i]} ({self.usernames[i]})"
+
+    # --- candidate sets ---
+    def _prefix(self, query):
+        ids = set()
+        lo = bisect.bisect_left(self._name_keys, query)
+        hi = bisect.bisect_left(self._name_keys, query + "\uffff")
+        ids.update(range(lo, hi))
+        lo = bisect.bisect_left(self._user_keys, (query,))
+        hi = bisect.bisect_left(self._user_keys, (query + "\uffff",))
+        ids.update(i for _, i in self._user_keys[lo:hi])
+        return ids
+
+    def _fuzzy(self, query, limit=200, min_similarity=0.3):
+        grams = _trigrams(query)
+        counts = defaultdict(int)
+        for g in grams:
+            for i in self._trigrams.get(g, ()):
+                counts[i] += 1
+        scored = []
+        for i, shared in counts.items():
+            total = len(grams) + self._gram_counts[i] - shared
+            similarity = shared / total if total else 0.0
+            if similarity >= min_similarity:
+                scored.append((-similarity, i))
+        scored.sort()
+        return [i for _, i in scored[:limit]]
+
+    def _attendance_range(self, low, high):
+        lo = bisect.bisect_left(self._attendance_sorted, low)
+        hi = bisect.bisect_right(self._attendance_sorted, high)
+        return self._by_attendance[lo:hi]
+
+    def _ranked(self, query, subject, attendance):
+        # Ordered ids matching everything; candidates come from the narrowest source and are
+        # filtered per id, so no set over the whole roster is built
+        low, high = attendance if attendance is not None else (None, None)
+
+        def keep(i):
+            return ((not subject or subject in self.subjects[i])
+                    and (attendance is None or low <= self.attendance[i] <= high))
+
+        if query:
+            prefix = self._prefix(query)
+            candidates = sorted(prefix) if prefix else self._fuzzy(query)
+        elif subject:
+            candidates = self._by_subject.get(subject, [])    # already in roster order
+        else:
+            return sorted(self._attendance_range(low, high))
+        return [i for i in candidates if keep(i)]
+
+    # --- public API ---
+    def search(self, query="", subject=None, attendance=None, page=0, page_size=20):
+        """Return ``(ids, total)`` for one page of matching students.
+
+        Prefix matches come first in roster order; if there are none, fuzzy
+        (trigram) matches are returned best-first. ``attendance`` is an
+        inclusive ``(low, high)`` range.
+        """
+        query = query.strip().lower()
+        start = page * page_size
+        if not (query or subject or attendance is not None):
+            total = len(self)
+            return list(range(start, min(start + page_size, total))), total
+
+        key = (query, subject, tuple(attendance) if attendance is not None else None)
+        with self._results_lock:
+            ranked = self._results.get(key)
+            if ranked is not None:
+                self._results.move_to_end(key)
+        if ranked is None:
+            ranked = self._ranked(*key)
+            with self._results_lock:
+                self._results[key] = ranked
+                while len(self._results) > RESULT_CACHE_SIZE:
+                    self._results.popitem(last=False)
+        return ranked[start:start + page_size], len(ranked)
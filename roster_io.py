@@ -0,0 +1,192 @@
+"""Bulk roster import/export.
+
+    python roster_io.py import roster.csv [--batch-size 1000]
+    python roster_io.py export students.jsonl [--role teacher] [--include-passwords]
+
+CSV columns: role, username, password, name, roll_no, subjects, subject,
+attendance. ``subjects`` is a ``;``-separated list of SYLLABUS subjects for
+students; ``subject`` is the single subject a teacher owns. JSONL rows use
+the same keys with ``subjects`` as a list. ``role`` defaults to student.
+
+Rows are streamed, validated and written in batched transactions. Invalid
+rows and usernames that already exist are reported without stopping the
+import. A running app picks up imported users within a few seconds.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+
+from storage import DB_FILE, Storage
+from syllabus import SYLLABUS
+
+ROLES = ("student", "teacher")
+CSV_FIELDS = ["role", "username", "password", "name", "roll_no", "subjects", "subject", "attendance"]
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    duplicates: list = field(default_factory=list)
+    errors: list = field(default_factory=list)   # (line number, message)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self):
+        total = self.imported + len(self.duplicates) + len(self.errors)
+        return total / self.seconds if self.seconds else 0.0
+
+
+# --- reading ---
+def _detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def iter_rows(fp, fmt):
+    """Yield ``(line_number, dict)`` from an open CSV or JSONL file without loading it all."""
+    if fmt == "csv":
+        reader = csv.DictReader(fp)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for n, line in enumerate(fp, 1):
+            line = line.strip()
+            if line:
+                try:
+                    yield n, json.loads(line)
+                except json.JSONDecodeError:
+                    yield n, None
+
+
+def validate(row):
+    """Turn one raw row into ``(role, username, record)`` or raise ValueError."""
+    if not isinstance(row, dict):
+        raise ValueError("row is not a JSON object")
+    role = (row.get("role") or "student").strip().lower()
+    if role not in ROLES:
+        raise ValueError(f"unknown role '{role}'")
+    username = (row.get("username") or "").strip()
+    password = row.get("password") or ""
+    if not username or not password:
+        raise ValueError("username and password are required")
+    name = (row.get("name") or "").strip() or username
+
+    if role == "teacher":
+        subject = (row.get("subject") or "General").strip()
+        if subject != "General" and subject not in SYLLABUS:
+            raise ValueError(f"unknown subject '{subject}'")
+        return role, username, {"password": password, "name": name, "subject": subject, "feedback_score": 0.0}
+
+    subjects = row.get("subjects") or []
+    if isinstance(subjects, str):
+        subjects = [s.strip() for s in subjects.split(";") if s.strip()]
+    unknown = [s for s in subjects if s not in SYLLABUS]
+    if unknown:
+        raise ValueError(f"unknown subject(s): {', '.join(unknown)}")
+
+    attendance = row.get("attendance")
+    try:
+        attendance = int(attendance) if attendance not in (None, "") else 0
+    except (TypeError, ValueError):
+        raise ValueError(f"attendance must be an integer, got '{attendance}'")
+    if not 0 <= attendance <= 100:
+        raise ValueError(f"attendance must be between 0 and 100, got {attendance}")
+
+    record = {"password": password, "name": name, "subjects": subjects or list(SYLLABUS.keys()),
+              "marks": {}, "attendance": attendance, "has_data": False}
+    if row.get("roll_no"):
+        record["roll_no"] = str(row["roll_no"]).strip()
+    return role, username, record
+
+
+def import_roster(storage, fp, fmt, batch_size=1000):
+    report = ImportReport()
+    start = time.perf_counter()
+    batch, seen = [], set()
+
+    def flush():
+        duplicates = storage.insert_users(batch)
+        report.duplicates.extend(duplicates)
+        report.imported += len(batch) - len(duplicates)
+        batch.clear()
+
+    for line, row in iter_rows(fp, fmt):
+        try:
+            role, username, record = validate(row)
+        except (ValueError, AttributeError, TypeError) as e:
+            report.errors.append((line, str(e)))
+            continue
+        if (role, username) in seen:
+            report.duplicates.append(username)
+            continue
+        seen.add((role, username))
+        batch.append((role, username, record))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+# --- writing ---
+def export_roster(storage, fp, fmt, role="student", include_passwords=False):
+    """Stream every student or teacher to ``fp``. Returns the number of rows written."""
+    table = "students" if role == "student" else "teachers"
+    writer = csv.DictWriter(fp, fieldnames=CSV_FIELDS, extrasaction="ignore") if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+    count = 0
+    for username, record in storage.iter_records(table):
+        row = {"role": role, "username": username, **record}
+        if not include_passwords:
+            row.pop("password", None)
+        if writer:
+            if role == "student":
+                row["subjects"] = ";".join(row.get("subjects", []))
+            writer.writerow(row)
+        else:
+            fp.write(json.dumps(row) + "\n")
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_in = sub.add_parser("import")
+    p_in.add_argument("path")
+    p_in.add_argument("--batch-size", type=int, default=1000)
+    p_out = sub.add_parser("export")
+    p_out.add_argument("path")
+    p_out.add_argument("--role", choices=ROLES, default="student")
+    p_out.add_argument("--include-passwords", action="store_true")
+    args = parser.parse_args()
+
+    storage = Storage(args.db)
+    fmt = _detect_format(args.path, args.format)
+    if args.command == "import":
+        with open(args.path, "r", newline="", encoding="utf-8") as fp:
+            report = import_roster(storage, fp, fmt, args.batch_size)
+        for line, message in report.errors:
+            print(f"line {line}: {message}", file=sys.stderr)
+        if report.duplicates:
+            print(f"{len(report.duplicates)} duplicate username(s) skipped: {', '.join(report.duplicates[:20])}"
+                  + (" ..." if len(report.duplicates) > 20 else ""), file=sys.stderr)
+        print(f"Imported {report.imported} rows in {report.seconds:.2f}s ({report.rows_per_sec:,.0f} rows/sec)")
+    else:
+        with open(args.path, "w", newline="", encoding="utf-8") as fp:
+            count = export_roster(storage, fp, fmt, args.role, args.include_passwords)
+        print(f"Exported {count} {args.role}s to {os.path.abspath(args.path)}")
+
+
+if __name__ == "__main__":
+    main()
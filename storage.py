@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+# --- TRANSACTIONAL USER STORE ---
+# SQLite in WAL mode: readers never block the writer, every write is a
+# single-row upsert inside its own transaction, and concurrent Streamlit
+# sessions can no longer overwrite each other's changes. Each record is kept
+# as a JSON document next to the columns we look it up by.
+
+DB_FILE = "users_data.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    username TEXT PRIMARY KEY,
+    name TEXT,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS teachers (
+    username TEXT PRIMARY KEY,
+    name TEXT,
+    subject TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_teachers_subject ON teachers (subject);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class Storage:
+    def __init__(self, path=DB_FILE, legacy_json=None):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        if legacy_json and os.path.exists(legacy_json) and self.is_empty():
+            self.migrate_json(legacy_json)
+
+    def _conn(self):
+        # One connection per thread; Streamlit runs each session on its own script thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self._conn()
+        with conn:
+            yield conn
+
+    # --- reads ---
+    def query(self, sql, params=()):
+        return self._conn().execute(sql, params).fetchall()
+
+    def is_empty(self):
+        conn = self._conn()
+        return not (conn.execute("SELECT 1 FROM students LIMIT 1").fetchone()
+                    or conn.execute("SELECT 1 FROM teachers LIMIT 1").fetchone())
+
+    def load(self):
+        conn = self._conn()
+        students = {u: json.loads(r) for u, r in conn.execute("SELECT username, record FROM students")}
+        teachers = {u: json.loads(r) for u, r in conn.execute("SELECT username, record FROM teachers")}
+        return {"students": students, "teachers": teachers}
+
+    def generation(self):
+        """Counter bumped by out-of-band bulk writes (e.g. roster imports from the CLI)."""
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def get_student(self, username):
+        row = self._conn().execute("SELECT record FROM students WHERE username = ?", (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_teacher(self, username):
+        row = self._conn().execute("SELECT record FROM teachers WHERE username = ?", (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def teachers_by_subject(self, subject):
+        return [u for (u,) in self._conn().execute(
+            "SELECT username FROM teachers WHERE subject = ? ORDER BY username", (subject,))]
+
+    # --- writes ---
+    def _upsert_student(self, conn, username, record):
+        conn.execute(
+            "INSERT INTO students (username, name, record) VALUES (?, ?, ?) "
+            "ON CONFLICT (username) DO UPDATE SET name = excluded.name, record = excluded.record",
+            (username, record.get("name"), json.dumps(record)),
+        )
+
+    def _upsert_teacher(self, conn, username, record):
+        conn.execute(
+            "INSERT INTO teachers (username, name, subject, record) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (username) DO UPDATE SET name = excluded.name, subject = excluded.subject, record = excluded.record",
+            (username, record.get("name"), record.get("subject"), json.dumps(record)),
+        )
+
+    def upsert_student(self, username, record):
+        with self.transaction() as conn:
+            self._upsert_student(conn, username, record)
+
+    def upsert_teacher(self, username, record):
+        with self.transaction() as conn:
+            self._upsert_teacher(conn, username, record)
+
+    def update_teacher(self, username, update):
+        """Read-modify-write one teacher atomically; ``update(record)`` mutates it in place."""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT record FROM teachers WHERE username = ?", (username,)).fetchone()
+            if row is None:
+                return None
+            record = json.loads(row[0])
+            update(record)
+            self._upsert_teacher(conn, username, record)
+        return record
+
+    def _insert_user(self, conn, role, username, record):
+        if role == "student":
+            cur = conn.execute(
+                "INSERT INTO students (username, name, record) VALUES (?, ?, ?) ON CONFLICT (username) DO NOTHING",
+                (username, record.get("name"), json.dumps(record)),
+            )
+        else:
+            cur = conn.execute(
+                "INSERT INTO teachers (username, name, subject, record) VALUES (?, ?, ?, ?) ON CONFLICT (username) DO NOTHING",
+                (username, record.get("name"), record.get("subject"), json.dumps(record)),
+            )
+        return cur.rowcount == 1
+
+    def insert_user(self, role, username, record):
+        """Create a student or teacher. Returns False if the username is already taken."""
+        with self.transaction() as conn:
+            return self._insert_user(conn, role, username, record)
+
+    def insert_users(self, users):
+        """Insert many ``(role, username, record)`` rows in one transaction.
+
+        Existing usernames are left untouched and returned, so a bulk import
+        can report duplicates without aborting.
+        """
+        duplicates = []
+        with self.transaction() as conn:
+            for role, username, record in users:
+                if not self._insert_user(conn, role, username, record):
+                    duplicates.append(username)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('generation', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1"
+            )
+        return duplicates
+
+    def iter_records(self, table, batch_size=1000):
+        """Stream ``(username, record)`` pairs from ``students`` or ``teachers``."""
+        if table not in ("students", "teachers"):
+            raise ValueError(f"unknown table: {table}")
+        cur = self._conn().execute(f"SELECT username, record FROM {table} ORDER BY username")
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            for username, record in rows:
+                yield username, json.loads(record)
+
+    def upsert_many(self, students=None, teachers=None):
+        with self.transaction() as conn:
+            for username, record in (students or {}).items():
+                self._upsert_student(conn, username, record)
+            for username, record in (teachers or {}).items():
+                self._upsert_teacher(conn, username, record)
+
+    # --- migration ---
+    def migrate_json(self, json_path):
+        """One-time import of the old users_data.json; the file is renamed afterwards."""
+        with open(json_path, "r") as f:
+            data = json.load(f)
+        self.upsert_many(data.get("students", {}), data.get("teachers", {}))
+        os.replace(json_path, json_path + ".migrated")
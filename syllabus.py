@@ -0,0 +1,21 @@
+# --- DATA & SYLLABUS ---
+# Kept outside app.py so offline jobs and benchmarks can import it without Streamlit.
+SYLLABUS = {
+    "Engineering Physics": {"chapters": ["Fundamentals of Photonics", "Quantum Physics", "Wave Optics", "Semiconductor Physics"]},
+    "Engineering Chemistry": {"chapters": ["Water Technology", "Instrumental Methods", "Advanced Materials", "Corrosion"]},
+    "Basic Electrical Engineering": {"chapters": ["DC Circuits", "AC Fundamentals", "Electric Machines"]},
+    "Engineering Mechanics": {"chapters": ["Force Systems", "Equilibrium", "Friction", "Kinematics"]},
+    "Engineering Graphics": {"chapters": ["Projections", "Curves", "Isometric Projection"]},
+    "Mathematics-I": {"chapters": ["Calculus", "Matrices", "Eigen Values"]},
+    "Programming": {"chapters": ["C Intro", "Control Flow", "Arrays", "Functions"]}
+}
+
+STATIC_QUESTIONS = {
+    "Default": [
+        {"q": "Which law states V=IR?", "opts": ["Ohm's Law", "Newton's Law", "Kirchhoff's Law", "Faraday's Law"], "ans": "Ohm's Law"},
+        {"q": "What is the unit of Force?", "opts": ["Newton", "Joule", "Watt", "Pascal"], "ans": "Newton"},
+        {"q": "Binary 1010 equals decimal...", "opts": ["10", "5", "12", "8"], "ans": "10"},
+        {"q": "Integral of x dx is...", "opts": ["x^2 / 2", "x^2", "2x", "1/x"], "ans": "x^2 / 2"},
+        {"q": "Power is defined as...", "opts": ["Rate of doing work", "Force x Distance", "Mass x Velocity", "None"], "ans": "Rate of doing work"}
+    ]
+}
@@ -0,0 +1,47 @@
+import pytest
+
+from answer_cache import AnswerCache
+
+TEACHING = "teaching-context"
+LESSON = "Create a detailed lesson plan for {}"
+REMEDIAL = "Generate a 3-step remedial lesson plan for engineering students struggling with {}."
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(str(tmp_path / "answers.db"))
+
+
+@pytest.mark.parametrize("template, cached_topic, asked_topic", [
+    (LESSON, "Wave Optics", "Wave Mechanics"),
+    (REMEDIAL, "Wave Optics and Quantum Physics", "Wave Optics and Semiconductor Physics"),
+])
+def test_templated_prompts_for_distinct_topics_do_not_match(cache, template, cached_topic, asked_topic):
+    cache.put(TEACHING, template.format(cached_topic), f"plan for {cached_topic}")
+
+    assert cache.get(TEACHING, template.format(asked_topic), near=False) is None
+    hit = cache.get(TEACHING, template.format(cached_topic), near=False)
+    assert hit.answer == f"plan for {cached_topic}" and not hit.near
+
+
+def test_exact_lookup_ignores_case_and_punctuation(cache):
+    cache.put(TEACHING, LESSON.format("Wave Optics"), "plan")
+
+    assert cache.get(TEACHING, "create a detailed lesson plan for wave optics!", near=False).answer == "plan"
+
+
+def test_near_match_serves_a_rewording(cache):
+    question = "Explain the working principle of a p-n junction diode under forward bias in detail"
+    cache.put("doc", question, "answer")
+
+    hit = cache.get("doc", question + " please")
+    assert hit.answer == "answer" and hit.near
+    assert cache.get("other-doc", question + " please") is None
+
+
+def test_near_match_rejects_a_substituted_term(cache):
+    cache.put("doc", "Describe the fringe pattern in a double slit experiment with monochromatic light", "answer")
+
+    assert cache.get("doc", "Describe the fringe pattern in a double slit experiment with white light") is None
+    hit = cache.get("doc", "Please describe the fringe pattern in the double slit experiment with monochromatic light")
+    assert hit.answer == "answer" and hit.near
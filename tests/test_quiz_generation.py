@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from quiz_generation import QuestionParser
+
+VALID = [
+    {"q": "Unit of force?", "opts": ["N", "J"], "ans": "N"},
+    {"q": "Unit of energy?", "opts": ["N", "J"], "ans": "J"},
+]
+
+
+def parse(text, chunk):
+    parser = QuestionParser()
+    out = []
+    for i in range(0, len(text), chunk):
+        out += parser.feed(text[i:i + chunk])
+    out += parser.close()
+    return out, parser.rejected
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 10 ** 6])
+@pytest.mark.parametrize("question", [
+    "For the matrix [a_{ij}] what is the trace?",
+    "Which Python literal is {'a': {'b': 1}, {'c'}}?",
+])
+def test_boundary_like_text_inside_a_string_is_kept(chunk, question):
+    items = [{"q": question, "opts": ["x", "y"], "ans": "x"}] + VALID
+
+    out, rejected = parse(json.dumps(items), chunk)
+
+    assert out == items and rejected == 0
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 10 ** 6])
+def test_unclosed_string_costs_only_its_object(chunk):
+    text = '[{"q":"F?, "opts":["a","b"],"ans":"a"},' + json.dumps(VALID)[1:]
+
+    out, rejected = parse(text, chunk)
+
+    assert out == VALID and rejected == 1
@@ -0,0 +1,29 @@
+from retrieval import RetrievalIndex, chunk_text
+
+SYLLABUS = """ENGINEERING PHYSICS
+Unit 1 Wave Optics
+1.1 Interference in thin films
+1.2 Diffraction at a single slit
+Unit 2 Lasers
+2.1 Laser characteristics and spontaneous emission
+2.2 Semiconductor laser
+"""
+
+
+def test_numbered_topic_list_is_indexed():
+    chunks = chunk_text(SYLLABUS)
+
+    headings = [heading for heading, _ in chunks]
+    assert "1.2 Diffraction at a single slit" in headings
+    assert headings[-1] == "2.2 Semiconductor laser"
+
+    index = RetrievalIndex(SYLLABUS)
+    assert len(index) == len(chunks)
+    assert "Unit 2 Lasers" in index.overview(1000)
+    assert "2.1 Laser characteristics" in index.search("laser characteristics", 50)
+
+
+def test_heading_with_body_keeps_body_chunk_only():
+    chunks = chunk_text("Unit 1 Wave Optics\nInterference of light waves in thin films.\n")
+
+    assert chunks == [("Unit 1 Wave Optics", "Interference of light waves in thin films.")]
@@ -0,0 +1,265 @@
+import bisect
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import threading
+import time
+from collections import OrderedDict
+
+
+# --- HOT-PATH TRACING ---
+# Timed spans around the expensive steps of a rerun (PDF extraction, Gemini
+# calls, saves, chart builds). Each finished span is folded into a
+# per-name latency histogram and into its session's totals, and can be
+# appended to a rotating JSONL file. Spans are attributed to the rerun that
+# opened them through a ContextVar, which LLMClient already carries into its
+# worker threads. While tracing is off, span() hands back one shared no-op
+# object, so instrumented code pays for an attribute check and a call.
+
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 60000]   # upper bounds; one overflow bucket
+MAX_SESSIONS = 200          # sessions whose totals and last rerun are kept (least recently active dropped)
+MAX_RERUN_SPANS = 100       # spans kept for one rerun's breakdown
+
+_rerun = contextvars.ContextVar("trace_rerun", default=None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __bool__(self):
+        # Lets callers skip work that only feeds attributes: ``if span: span.set(...)``
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, **counts):
+        pass
+
+    def elapsed_ms(self):
+        return 0.0
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "attrs", "start", "rerun")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.rerun = _rerun.get()
+
+    def __bool__(self):
+        return True
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Streamlit's rerun/stop signals are BaseExceptions, not failures
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._finish(self, self.elapsed_ms())
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.attrs[key] = self.attrs.get(key, 0) + value
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+
+class _Rerun:
+    __slots__ = ("session", "seq", "spans")
+
+    def __init__(self, session, seq):
+        self.session = session
+        self.seq = seq
+        self.spans = []
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total_ms", "max_ms", "sums")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.sums = {}            # numeric attribute -> total (prompt_chars, response_bytes, ...)
+
+    def add(self, ms, attrs):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        for key, value in attrs.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.sums[key] = self.sums.get(key, 0) + value
+
+    def percentile(self, q):
+        """Estimated from the buckets, interpolating linearly inside the one that holds the rank."""
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = BUCKETS_MS[i - 1] if i else 0.0
+                high = BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+                return min(self.max_ms, low + (high - low) * (rank - seen) / n)
+            seen += n
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "calls": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": self.max_ms,
+            "buckets": dict(zip([*map(str, BUCKETS_MS), "inf"], self.counts)),
+            **{f"mean_{key}": total / self.count for key, total in self.sums.items()},
+        }
+
+
+class Tracer:
+    def __init__(self, enabled=False, export_path=None, export_bytes=10 * 1024 * 1024, export_backups=3):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}                 # span name -> _Histogram
+        self._sessions = OrderedDict()        # session id -> {"user", "reruns", "totals", "last"}
+        self._seq = itertools.count(1)
+        self.export_bytes = export_bytes
+        self.export_backups = export_backups
+        self.export_path = None
+        self._export = None
+        self.set_export(export_path)
+
+    # --- configuration ---
+    def set_export(self, path):
+        """Append finished spans to ``path`` as JSON lines, rotating by size; None stops exporting."""
+        with self._lock:
+            if path == self.export_path:
+                return
+            if self._export is not None:
+                for handler in self._export.handlers:
+                    handler.close()
+                self._export.handlers.clear()
+                self._export = None
+            if path:
+                logger = logging.getLogger(f"{__name__}.export.{id(self)}")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                handler = logging.handlers.RotatingFileHandler(
+                    path, maxBytes=self.export_bytes, backupCount=self.export_backups, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                self._export = logger
+            self.export_path = path
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._sessions.clear()
+
+    # --- recording ---
+    def span(self, name, **attrs):
+        """Context manager timing one step; ``attrs`` (sizes, model, ...) are kept with it."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def rerun(self, session, user=None, page=None):
+        """Root span for one script run of ``session``; spans opened inside it are attributed to it."""
+        if not self.enabled:
+            return NOOP_SPAN
+        return _RerunSpan(self, session, user, page)
+
+    def _finish(self, span, ms):
+        rerun = span.rerun
+        with self._lock:
+            self._histograms.setdefault(span.name, _Histogram()).add(ms, span.attrs)
+            if rerun is not None:
+                session = self._session(rerun.session)
+                totals = session["totals"].setdefault(span.name, [0, 0.0])
+                totals[0] += 1
+                totals[1] += ms
+                if len(rerun.spans) < MAX_RERUN_SPANS:
+                    rerun.spans.append((span.name, ms, span.attrs))
+            export = self._export
+        if export is not None:
+            record = {"ts": time.time(), "name": span.name, "ms": round(ms, 3), **span.attrs}
+            if rerun is not None:
+                record.update(session=rerun.session, rerun=rerun.seq)
+            export.info(json.dumps(record, default=str))
+
+    def _session(self, session_id):
+        # Caller holds self._lock
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = {"user": None, "reruns": 0, "totals": {}, "last": []}
+            while len(self._sessions) > MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    # --- reading ---
+    def stats(self):
+        """Histogram summary per span name."""
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self._histograms.items())}
+
+    def session_stats(self, session_id):
+        """Totals per span name and the previous rerun's spans for one session, or None."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            return {"user": session["user"], "reruns": session["reruns"],
+                    "totals": {name: {"calls": n, "total_ms": ms} for name, (n, ms) in session["totals"].items()},
+                    "last": list(session["last"])}
+
+    def sessions(self):
+        """Session ids, most recently active first."""
+        with self._lock:
+            return list(reversed(self._sessions))
+
+
+class _RerunSpan(Span):
+    __slots__ = ("user", "token")
+
+    def __init__(self, tracer, session, user, page):
+        super().__init__(tracer, "rerun", {"page": page} if page else {})
+        self.user = user
+        # Spans opened during this run (including in LLMClient's worker threads) attach to this rerun
+        self.rerun = _Rerun(session, next(tracer._seq))
+
+    def __enter__(self):
+        self.token = _rerun.set(self.rerun)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        _rerun.reset(self.token)
+        super().__exit__(exc_type, exc, tb)
+        with self.tracer._lock:
+            session = self.tracer._session(self.rerun.session)
+            session["user"] = self.user
+            session["reruns"] += 1
+            session["last"] = self.rerun.spans
+        return False